@@ -1,5 +1,29 @@
 import os
-from typing import List
+from typing import List, Optional
+
+
+def _int(name: str, default: int, minimum: Optional[int] = None) -> int:
+    try:
+        value = int(os.getenv(name, str(default)))
+    except ValueError:
+        value = default
+    return value if minimum is None else max(minimum, value)
+
+
+def _float(name: str, default: float, minimum: Optional[float] = None) -> float:
+    try:
+        value = float(os.getenv(name, str(default)))
+    except ValueError:
+        value = default
+    return value if minimum is None else max(minimum, value)
+
+
+def _flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    # Switches that are on by default only turn off explicitly, and vice versa
+    return value not in ("0", "false", "False") if default else value in ("1", "true", "True")
 
 class Settings:
     @property
@@ -26,4 +50,166 @@ class Settings:
     def COOKIE_DOMAIN(self) -> str:
         return os.getenv("COOKIE_DOMAIN", "localhost")
 
+    @property
+    def GZIP_MIN_BYTES(self) -> int:
+        return int(os.getenv("GZIP_MIN_BYTES", "1024"))
+
+    # Shared upstream HTTP client
+    @property
+    def HTTP_CONNECT_TIMEOUT(self) -> float:
+        return _float("HTTP_CONNECT_TIMEOUT", 5.0)
+
+    @property
+    def HTTP_READ_TIMEOUT(self) -> float:
+        return _float("HTTP_READ_TIMEOUT", 20.0)
+
+    @property
+    def HTTP_RETRIES(self) -> int:
+        return _int("HTTP_RETRIES", 2, minimum=0)
+
+    @property
+    def HTTP_BACKOFF(self) -> float:
+        return _float("HTTP_BACKOFF", 0.5, minimum=0.0)
+
+    @property
+    def HTTP_POOL_HOSTS(self) -> int:
+        return _int("HTTP_POOL_HOSTS", 20, minimum=1)
+
+    @property
+    def HTTP_POOL_PER_HOST(self) -> int:
+        return _int("HTTP_POOL_PER_HOST", 10, minimum=1)
+
+    # Per-source circuit breakers and adaptive timeouts
+    @property
+    def BREAKER_FAILURES(self) -> int:
+        return _int("BREAKER_FAILURES", 3, minimum=1)
+
+    @property
+    def BREAKER_COOLDOWN(self) -> float:
+        return _float("BREAKER_COOLDOWN", 60)
+
+    @property
+    def BREAKER_MAX_COOLDOWN(self) -> float:
+        return _float("BREAKER_MAX_COOLDOWN", 600)
+
+    @property
+    def ADAPTIVE_TIMEOUT_MIN(self) -> float:
+        return _float("ADAPTIVE_TIMEOUT_MIN", 2)
+
+    @property
+    def ADAPTIVE_TIMEOUT_FACTOR(self) -> float:
+        return _float("ADAPTIVE_TIMEOUT_FACTOR", 3)
+
+    # Upstream response cache
+    @property
+    def UPSTREAM_CACHE(self) -> bool:
+        return _flag("UPSTREAM_CACHE", True)
+
+    @property
+    def UPSTREAM_CACHE_PATH(self) -> Optional[str]:
+        return os.getenv("UPSTREAM_CACHE_PATH")
+
+    @property
+    def UPSTREAM_CACHE_MAX_MB(self) -> float:
+        return _float("UPSTREAM_CACHE_MAX_MB", 256)
+
+    @property
+    def UPSTREAM_CACHE_RECENT_TTL(self) -> float:
+        return _float("UPSTREAM_CACHE_RECENT_TTL", 900)
+
+    # Ingest
+    @property
+    def OPEN_METEO_BATCH_SIZE(self) -> int:
+        return _int("OPEN_METEO_BATCH_SIZE", 50, minimum=1)
+
+    @property
+    def OPENAQ_PAGE_SIZE(self) -> int:
+        return _int("OPENAQ_PAGE_SIZE", 1000, minimum=1)
+
+    @property
+    def OPENAQ_MAX_WORKERS(self) -> int:
+        return _int("OPENAQ_MAX_WORKERS", 6, minimum=1)
+
+    @property
+    def OPENAQ_MAX_PAGES(self) -> int:
+        return _int("OPENAQ_MAX_PAGES", 50, minimum=1)
+
+    @property
+    def UPSERT_CHUNK_SIZE(self) -> int:
+        return _int("UPSERT_CHUNK_SIZE", 500, minimum=1)
+
+    @property
+    def SOURCE_TIMEOUT(self) -> float:
+        return _float("SOURCE_TIMEOUT", 20)
+
+    @property
+    def SCRAPE_BUDGET(self) -> float:
+        return _float("SCRAPE_BUDGET", 35)
+
+    @property
+    def INGEST_GAP_TOLERANCE_HOURS(self) -> int:
+        return _int("INGEST_GAP_TOLERANCE_HOURS", 2, minimum=0)
+
+    @property
+    def INGEST_TODAY_TTL(self) -> float:
+        return _float("INGEST_TODAY_TTL", 3600)
+
+    @property
+    def INGEST_DB_LOCK(self) -> bool:
+        return _flag("INGEST_DB_LOCK", False)
+
+    @property
+    def INGEST_DB_LOCK_TIMEOUT(self) -> int:
+        return _int("INGEST_DB_LOCK_TIMEOUT", 60, minimum=0)
+
+    @property
+    def RAW_STORE(self) -> bool:
+        return _flag("RAW_STORE", True)
+
+    @property
+    def RAW_STORE_CHUNK_SIZE(self) -> int:
+        return _int("RAW_STORE_CHUNK_SIZE", 2000, minimum=1)
+
+    @property
+    def GEOCODE_NEGATIVE_TTL(self) -> float:
+        return _float("GEOCODE_NEGATIVE_TTL", 3600)
+
+    # Background refresh scheduler
+    @property
+    def INGEST_SCHEDULER(self) -> bool:
+        return _flag("INGEST_SCHEDULER", True)
+
+    @property
+    def INGEST_REFRESH_SECONDS(self) -> float:
+        return _float("INGEST_REFRESH_SECONDS", 900)
+
+    @property
+    def INGEST_FRESHNESS_SECONDS(self) -> float:
+        return _float("INGEST_FRESHNESS_SECONDS", 900)
+
+    @property
+    def INGEST_CONCURRENCY(self) -> int:
+        return _int("INGEST_CONCURRENCY", 2, minimum=1)
+
+    @property
+    def INGEST_TRACK_TTL_HOURS(self) -> float:
+        return _float("INGEST_TRACK_TTL_HOURS", 24)
+
+    @property
+    def INGEST_MAX_CITIES(self) -> int:
+        return _int("INGEST_MAX_CITIES", 50, minimum=1)
+
+    # Partitions and retention
+    @property
+    def PARTITION_MAINTENANCE(self) -> bool:
+        return _flag("PARTITION_MAINTENANCE", False)
+
+    @property
+    def PARTITIONS_AHEAD(self) -> int:
+        return _int("PARTITIONS_AHEAD", 3, minimum=1)
+
+    @property
+    def MEASUREMENTS_RETENTION_MONTHS(self) -> int:
+        return _int("MEASUREMENTS_RETENTION_MONTHS", 0, minimum=0)
+
 settings = Settings()
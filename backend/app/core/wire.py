@@ -0,0 +1,82 @@
+"""
+Response encoding: a faster JSON renderer and the opt-in columnar format.
+
+Clients ask for columnar payloads with `?format=columnar`. A time series then
+becomes {"start", "step", "n", <field>: [values...]} instead of a list of
+per-point dicts repeating every key; when the timestamps are not evenly spaced
+(e.g. LTTB-downsampled series) the "ts" array is sent instead of start/step.
+Tables keyed by city become {"cities": [...], <field>: [values...]}.
+"""
+import json
+import math
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # in requirements.txt; plain json keeps working without it
+    orjson = None
+
+
+def _finite(obj: Any) -> Any:
+    # What orjson does natively: NaN and +/-inf are not JSON, send them as null
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _finite(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(v) for v in obj]
+    return obj
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson, or compact json.dumps without it; NaN/inf become null either way."""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+        try:
+            text = json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+        except ValueError:
+            # Only non-finite floats make allow_nan=False raise; the walk is skipped otherwise
+            text = json.dumps(_finite(content), ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+        return text.encode("utf-8")
+
+
+def wants_columnar(fmt: Optional[str]) -> bool:
+    return (fmt or "").lower() == "columnar"
+
+
+def _parse_ts(ts: str) -> Optional[datetime]:
+    try:
+        return datetime.strptime(ts, "%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError):
+        return None
+
+
+def columnar_series(points: Sequence[Dict[str, Any]], fields: Sequence[str]) -> Dict[str, Any]:
+    """Per-point dicts with "ts" -> start/step (seconds) or ts array, plus one array per field."""
+    out: Dict[str, Any] = {"format": "columnar", "n": len(points)}
+    stamps = [_parse_ts(p.get("ts")) for p in points]
+    steps = {(b - a).total_seconds() for a, b in zip(stamps, stamps[1:])} if all(stamps) else {None}
+    if points and len(steps) <= 1 and None not in steps:
+        out["start"] = points[0]["ts"]
+        out["step"] = int(steps.pop()) if steps else 3600
+    else:
+        out["ts"] = [p.get("ts") for p in points]
+    for f in fields:
+        out[f] = [p.get(f) for p in points]
+    return out
+
+
+def columnar_table(rows: Dict[str, Dict[str, Any]], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """{city: {field: value}} -> {"cities": [...], field: [values...]}; fields default to the union of keys."""
+    if fields is None:
+        fields = list(dict.fromkeys(k for r in rows.values() if isinstance(r, dict) for k in r))
+    cities = list(rows)
+    out: Dict[str, Any] = {"format": "columnar", "cities": cities}
+    for f in fields:
+        out[f] = [rows[c].get(f) if isinstance(rows[c], dict) else None for c in cities]
+    return out
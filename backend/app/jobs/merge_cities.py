@@ -0,0 +1,112 @@
+"""
+One-off migration onto canonical city names.
+
+Run from backend/:  python -m app.jobs.merge_cities [--dry-run]
+
+Every distinct city spelling in measurements and measurements_daily is resolved
+to its canonical city
+(registering cities and aliases as needed, most common spelling first so it
+becomes the canonical name). Rows stored under other spellings are moved onto
+the canonical name; where both already hold the same (ts, source) the canonical
+row wins. Daily rollups are re-keyed the same way, and the days the moved hourly
+rows touch are rolled up again. Comparisons are BINARY so case-only variants
+are merged too.
+Model files cached under old spellings are not renamed and simply retrain.
+"""
+import argparse
+import logging
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from ..db import SessionLocal
+from ..services.canonical import resolve_city
+from ..services.rollups import rollup_hours
+
+
+logger = logging.getLogger(__name__)
+
+
+def _spellings(db):
+    # Daily rollups too: after retention some spellings only live there
+    return db.execute(text("""
+        SELECT MIN(city) AS city, SUM(n_hours) AS n, SUM(n_days) AS n_days
+        FROM (
+            SELECT MIN(city) AS city, COUNT(*) AS n_hours, 0 AS n_days FROM measurements GROUP BY BINARY city
+            UNION ALL
+            SELECT MIN(city), 0, COUNT(*) FROM measurements_daily GROUP BY BINARY city
+        ) s
+        GROUP BY BINARY city
+        ORDER BY n DESC, n_days DESC
+    """)).fetchall()
+
+
+def _merge(db, alias: str, canonical: str) -> int:
+    span = db.execute(text("SELECT MIN(ts), MAX(ts) FROM measurements WHERE BINARY city = :alias"),
+                      {"alias": alias}).fetchone()
+    # Drop alias rows that the canonical series already covers, then move the rest
+    db.execute(text("""
+        DELETE a FROM measurements a
+        JOIN measurements c
+          ON BINARY c.city = :canon AND c.source = a.source AND c.ts = a.ts
+        WHERE BINARY a.city = :alias
+    """), {"alias": alias, "canon": canonical})
+    moved = db.execute(
+        text("UPDATE measurements SET city = :canon WHERE BINARY city = :alias"),
+        {"alias": alias, "canon": canonical},
+    ).rowcount
+    db.execute(text("DELETE FROM geocodes WHERE BINARY city = :alias"), {"alias": alias})
+    # Daily rollups the same way: the canonical day wins, the alias' other days are
+    # re-keyed (they may be all that is left of days past hourly retention)
+    db.execute(text("""
+        DELETE a FROM measurements_daily a
+        JOIN measurements_daily c
+          ON BINARY c.city = :canon AND c.source = a.source AND c.day = a.day
+        WHERE BINARY a.city = :alias
+    """), {"alias": alias, "canon": canonical})
+    db.execute(text("UPDATE measurements_daily SET city = :canon WHERE BINARY city = :alias"),
+               {"alias": alias, "canon": canonical})
+    # Then re-roll only the days the moved hourly rows touch
+    if span[0] is not None:
+        rollup_hours(db, datetime.combine(span[0].date(), datetime.min.time()),
+                     datetime.combine(span[1].date() + timedelta(days=1), datetime.min.time()),
+                     where="city = :c", params={"c": canonical})
+    db.commit()
+    return moved
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--dry-run", action="store_true", help="print the planned merges without moving rows (cities and aliases are still registered)")
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    db = SessionLocal()
+    try:
+        spellings = _spellings(db)
+        print(f"{len(spellings)} distinct city spellings")
+        merged = failed = 0
+        for city, n, n_days in spellings:
+            try:
+                ref = resolve_city(db, city)
+            except Exception as e:
+                db.rollback()
+                logger.warning("Cannot resolve %r (%s rows, %s rollup days): %s", city, n, n_days, e)
+                failed += 1
+                continue
+            if city == ref.name:
+                continue
+            print(f"{city!r} ({n} rows, {n_days} rollup days) -> {ref.name!r} [{ref.id}]")
+            if not args.dry_run:
+                moved = _merge(db, city, ref.name)
+                print(f"  moved {moved}, dropped {n - moved} duplicates")
+            merged += 1
+        print(f"{merged} spellings {'to merge' if args.dry_run else 'merged'}, {failed} unresolved")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
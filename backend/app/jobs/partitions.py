@@ -0,0 +1,204 @@
+"""
+Monthly RANGE partitioning, retention and daily rollover for measurements.
+
+Run from backend/:
+
+    python -m app.jobs.partitions --init            # one-off: partition the existing table
+    python -m app.jobs.partitions                   # maintenance: add months ahead, apply retention
+    python -m app.jobs.partitions --dry-run
+
+Partitions are named pYYYYMM and hold [first day of month, first day of next
+month) via RANGE (TO_DAYS(ts)); a trailing pmax catches anything further out.
+Maintenance keeps PARTITIONS_AHEAD (default 3) future months split out of pmax.
+With MEASUREMENTS_RETENTION_MONTHS=N (default 0 = keep everything, at least
+MIN_RETENTION_MONTHS otherwise), whole months older than N months are first
+rolled up into measurements_daily and then dropped
+(DROP PARTITION, or a chunked DELETE if the table is not partitioned).
+The ingest scheduler runs maintain() daily when PARTITION_MAINTENANCE=1.
+"""
+import argparse
+import logging
+import sys
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Shortest retention that still holds the longest window the API accepts (90 days
+# in schemas.py) whole: anything shorter makes ingest re-fetch the dropped days
+# on every request and pile them back into the oldest partition.
+MIN_RETENTION_MONTHS = 4
+
+
+def _month_start(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def _add_months(d: date, n: int) -> date:
+    m = d.year * 12 + d.month - 1 + n
+    return date(m // 12, m % 12 + 1, 1)
+
+
+def _name(month: date) -> str:
+    return f"p{month.year:04d}{month.month:02d}"
+
+
+def _month_of(name: str) -> Optional[date]:
+    if len(name) == 7 and name[0] == "p" and name[1:].isdigit():
+        return date(int(name[1:5]), int(name[5:7]), 1)
+    return None
+
+
+def _definition(month: date) -> str:
+    return f"PARTITION {_name(month)} VALUES LESS THAN (TO_DAYS('{_add_months(month, 1).isoformat()}'))"
+
+
+def partitions(db: Session) -> List[str]:
+    """Partition names of measurements in order; empty when the table is not partitioned."""
+    rows = db.execute(text("""
+        SELECT PARTITION_NAME FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'measurements' AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """)).fetchall()
+    return [r[0] for r in rows]
+
+
+def init_partitions(db: Session, ahead: int, dry_run: bool = False) -> Optional[str]:
+    """Partition an unpartitioned measurements by month, from its oldest row to `ahead` months out."""
+    if partitions(db):
+        return None
+    oldest = db.execute(text("SELECT MIN(ts) FROM measurements")).scalar()
+    first = _month_start(oldest.date() if oldest else datetime.utcnow().date())
+    last = _add_months(_month_start(datetime.utcnow().date()), ahead)
+    months, m = [], first
+    while m <= last:
+        months.append(m)
+        m = _add_months(m, 1)
+    ddl = ("ALTER TABLE measurements PARTITION BY RANGE (TO_DAYS(ts)) (\n  "
+           + ",\n  ".join([_definition(m) for m in months] + ["PARTITION pmax VALUES LESS THAN MAXVALUE"])
+           + "\n)")
+    if not dry_run:
+        db.execute(text(ddl))
+    return ddl
+
+
+def add_future_partitions(db: Session, ahead: int, dry_run: bool = False) -> List[str]:
+    """Split months up to `ahead` months from now out of pmax."""
+    names = partitions(db)
+    months = [m for m in map(_month_of, names) if m is not None]
+    if not names or "pmax" not in names:
+        return []
+    target = _add_months(_month_start(datetime.utcnow().date()), ahead)
+    nxt = _add_months(max(months), 1) if months else _month_start(datetime.utcnow().date())
+    new = []
+    while nxt <= target:
+        new.append(nxt)
+        nxt = _add_months(nxt, 1)
+    if new and not dry_run:
+        db.execute(text(
+            "ALTER TABLE measurements REORGANIZE PARTITION pmax INTO (\n  "
+            + ",\n  ".join([_definition(m) for m in new] + ["PARTITION pmax VALUES LESS THAN MAXVALUE"])
+            + "\n)"
+        ))
+    return [_name(m) for m in new]
+
+
+def _expired_months(db: Session, cutoff: date) -> List[Tuple[date, Optional[str]]]:
+    names = partitions(db)
+    if names:
+        return [(m, n) for n in names for m in [_month_of(n)] if m is not None and m < cutoff]
+    oldest = db.execute(text("SELECT MIN(ts) FROM measurements WHERE ts < :c"), {"c": cutoff}).scalar()
+    if oldest is None:
+        return []
+    out, m = [], _month_start(oldest.date())
+    while m < cutoff:
+        out.append((m, None))
+        m = _add_months(m, 1)
+    return out
+
+
+def apply_retention(db: Session, keep_months: int, dry_run: bool = False) -> List[str]:
+    """Roll expired months into measurements_daily, then drop them from measurements."""
+    from ..services.rollups import rollup_hours
+
+    if keep_months <= 0:
+        return []
+    cutoff = _add_months(_month_start(datetime.utcnow().date()), -keep_months)
+    done = []
+    for month, partition in _expired_months(db, cutoff):
+        label = partition or _name(month)
+        done.append(label)
+        if dry_run:
+            continue
+        hi = datetime.combine(_add_months(month, 1), datetime.min.time())
+        # The first partition also holds everything older than its month
+        lo = datetime(1970, 1, 1) if partition else datetime.combine(month, datetime.min.time())
+        rolled = rollup_hours(db, lo, hi, partition=partition)
+        db.commit()
+        if partition:
+            db.execute(text(f"ALTER TABLE measurements DROP PARTITION {partition}"))
+        else:
+            while db.execute(text("DELETE FROM measurements WHERE ts >= :lo AND ts < :hi LIMIT 10000"),
+                             {"lo": lo, "hi": hi}).rowcount:
+                db.commit()
+        db.commit()
+        logger.info("Rolled %s into measurements_daily (%s rows affected) and dropped it", label, rolled)
+    return done
+
+
+def maintain(db: Session, dry_run: bool = False) -> dict:
+    ahead = settings.PARTITIONS_AHEAD
+    keep = settings.MEASUREMENTS_RETENTION_MONTHS
+    if 0 < keep < MIN_RETENTION_MONTHS:
+        logger.warning("MEASUREMENTS_RETENTION_MONTHS=%s is shorter than the 90-day request window; using %s",
+                       keep, MIN_RETENTION_MONTHS)
+        keep = MIN_RETENTION_MONTHS
+    added = add_future_partitions(db, ahead, dry_run)
+    dropped = apply_retention(db, keep, dry_run)
+    return {"added": added, "rolled_over": dropped}
+
+
+def run_maintenance() -> dict:
+    """Entry point for the scheduler: own session, never raises."""
+    from ..db import SessionLocal
+    db = SessionLocal()
+    try:
+        return maintain(db)
+    except Exception as e:
+        logger.warning("Partition maintenance failed: %s", e)
+        db.rollback()
+        return {"error": str(e)}
+    finally:
+        db.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from ..db import SessionLocal
+
+    ap = argparse.ArgumentParser(description="Partition maintenance for measurements.")
+    ap.add_argument("--init", action="store_true", help="partition the table by month if it is not yet")
+    ap.add_argument("--dry-run", action="store_true")
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    db = SessionLocal()
+    try:
+        if args.init:
+            ddl = init_partitions(db, settings.PARTITIONS_AHEAD, args.dry_run)
+            print(ddl if ddl else "measurements is already partitioned")
+        result = maintain(db, args.dry_run)
+        print(f"added: {', '.join(result['added']) or '-'}")
+        print(f"rolled over and dropped: {', '.join(result['rolled_over']) or '-'}")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+Rebuild aggregated series from the raw per-source store, without any network I/O.
+
+Run from backend/ after changing AGG_WEIGHTS / AGG_TRIM / AGG_TRIM_METHOD:
+
+    python -m app.jobs.reaggregate --days 90
+    python -m app.jobs.reaggregate --cities Colombo Delhi --start 2025-01-01 --end 2025-03-31 --workers 8
+
+Each city is processed by its own worker (own DB session) in chunks of
+--chunk-days: raw frames are loaded from measurements_raw, combined with the
+current aggregation settings and bulk-upserted as source='aggregated'. Hours
+with no raw inputs keep whatever aggregated value they already had.
+"""
+import argparse
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+
+from ..db import SessionLocal
+from ..services.aggregate import combine_by_timestamp
+from ..services.raw_store import load_frames
+from ..services.rollups import refresh_daily
+from ..services.scraper import upsert_rows_with_stats
+
+
+
+def _chunks(start: date, end: date, days: int) -> List[Tuple[date, date]]:
+    out = []
+    lo = start
+    while lo <= end:
+        hi = min(end, lo + timedelta(days=days - 1))
+        out.append((lo, hi))
+        lo = hi + timedelta(days=1)
+    return out
+
+
+def _stored_cities(db) -> List[str]:
+    return [r[0] for r in db.execute(text("SELECT DISTINCT city FROM raw_series ORDER BY city"))]
+
+
+def _city_coords(db, city: str) -> Tuple[Optional[float], Optional[float]]:
+    """Stored coordinates only (cities, then geocodes, then any raw series); never the network geocoder."""
+    for q in ("SELECT latitude, longitude FROM cities WHERE name = :c",
+              "SELECT latitude, longitude FROM geocodes WHERE city = :c",
+              "SELECT latitude, longitude FROM raw_series WHERE city = :c AND latitude IS NOT NULL "
+              "AND longitude IS NOT NULL ORDER BY id"):
+        row = db.execute(text(q), {"c": city}).first()
+        if row is not None:
+            return float(row[0]), float(row[1])
+    return None, None
+
+
+def reaggregate_city(city: str, chunks: List[Tuple[date, date]], dry_run: bool = False) -> dict:
+    """Re-combine one city's raw inputs chunk by chunk; returns summed upsert stats."""
+    totals = {"inserted": 0, "updated": 0, "unchanged": 0, "chunks": 0}
+    db = SessionLocal()
+    try:
+        lat, lon = _city_coords(db, city)
+        for lo, hi in chunks:
+            frames = load_frames(db, city, lo, hi)
+            if not frames:
+                continue
+            agg = combine_by_timestamp(city, lat, lon, frames.get("openaq"), frames.get("iqair"),
+                                       frames.get("waqi"), frames.get("open-meteo"))
+            if dry_run:
+                totals["inserted"] += len(agg)
+            else:
+                stats = upsert_rows_with_stats(db, agg)
+                if stats["inserted"] or stats["updated"]:
+                    refresh_daily(db, city, lo, hi)
+                    db.commit()
+                for k in ("inserted", "updated", "unchanged"):
+                    totals[k] += stats[k]
+            totals["chunks"] += 1
+    finally:
+        db.close()
+    return totals
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Rebuild aggregated series from measurements_raw.")
+    ap.add_argument("--cities", nargs="*", help="canonical city names (default: every city in the raw store)")
+    ap.add_argument("--days", type=int, default=30, help="window ending today when --start is not given")
+    ap.add_argument("--start", type=date.fromisoformat)
+    ap.add_argument("--end", type=date.fromisoformat)
+    ap.add_argument("--chunk-days", type=int, default=7)
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--dry-run", action="store_true", help="combine but do not write; 'inserted' counts rows produced")
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    end = args.end or datetime.utcnow().date()
+    start = args.start or end - timedelta(days=args.days)
+    chunks = _chunks(start, end, max(1, args.chunk_days))
+
+    cities = args.cities
+    if not cities:
+        db = SessionLocal()
+        try:
+            cities = _stored_cities(db)
+        finally:
+            db.close()
+    if not cities:
+        print("No cities in the raw store")
+        return 0
+
+    print(f"Re-aggregating {len(cities)} cities, {start}..{end} in {len(chunks)} chunks, {args.workers} workers")
+    started = time.monotonic()
+    failed = 0
+    grand = {"inserted": 0, "updated": 0, "unchanged": 0}
+    with ThreadPoolExecutor(max_workers=max(1, args.workers), thread_name_prefix="reagg") as pool:
+        futures = {pool.submit(reaggregate_city, c, chunks, args.dry_run): c for c in cities}
+        for done, fut in enumerate(as_completed(futures), 1):
+            city = futures[fut]
+            try:
+                t = fut.result()
+            except Exception as e:
+                failed += 1
+                print(f"[{done}/{len(cities)}] {city}: FAILED {e}")
+                continue
+            for k in grand:
+                grand[k] += t[k]
+            print(f"[{done}/{len(cities)}] {city}: {t['chunks']} chunks, "
+                  f"{t['inserted']} inserted, {t['updated']} updated, {t['unchanged']} unchanged")
+
+    print(f"Done in {time.monotonic() - started:.1f}s: {grand['inserted']} inserted, "
+          f"{grand['updated']} updated, {grand['unchanged']} unchanged, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""
+Backfill measurements_daily from the hourly measurements.
+
+Run from backend/:  python -m app.jobs.rollups [--days N]
+
+Ingestion keeps the rollups of the days it touches up to date; this job builds
+them for history that predates that (or re-derives them after manual edits),
+including the quantile sketches of rollups written before those existed.
+It walks the window one month at a time, committing after each month.
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import text
+
+from ..db import SessionLocal
+from ..services.rollups import rollup_hours
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Backfill measurements_daily from measurements.")
+    ap.add_argument("--days", type=int, help="only the last N days (default: all history)")
+    args = ap.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        if args.days:
+            start = today - timedelta(days=args.days)
+        else:
+            oldest = db.execute(text("SELECT MIN(ts) FROM measurements")).scalar()
+            if oldest is None:
+                print("measurements is empty")
+                return 0
+            start = oldest.replace(hour=0, minute=0, second=0, microsecond=0)
+        end = today + timedelta(days=2)  # covers 'today' in any session time zone
+
+        started = time.monotonic()
+        lo = start
+        while lo < end:
+            hi = min(end, (lo.replace(day=1) + timedelta(days=32)).replace(day=1))
+            n = rollup_hours(db, lo, hi)
+            db.commit()
+            print(f"{lo:%Y-%m-%d}..{hi - timedelta(days=1):%Y-%m-%d}: {n} rows affected")
+            lo = hi
+        print(f"Done in {time.monotonic() - started:.1f}s")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
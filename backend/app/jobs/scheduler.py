@@ -0,0 +1,173 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from ..core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class IngestScheduler:
+    """
+    Keeps recently requested ("hot") cities fresh off the request path.
+
+    Routers call track() for every city a user asks about and is_fresh() to decide
+    whether they still need to scrape inline. A background thread refreshes all hot
+    cities every `interval` seconds with at most `concurrency` parallel ingestions.
+    Cities drop out of the hot set `track_ttl` seconds after their last request.
+    """
+
+    def __init__(self, interval: float, freshness: float, concurrency: int,
+                 track_ttl: float, max_cities: int, maintenance: bool = False):
+        self.interval = interval
+        self.freshness = freshness
+        self.concurrency = max(1, concurrency)
+        self.track_ttl = track_ttl
+        self.max_cities = max(1, max_cities)
+        self._lock = threading.Lock()
+        # city -> (last requested at, widest window in days)
+        self._hot: Dict[str, Tuple[float, int]] = {}
+        # city -> (last ingested at, window in days it covered)
+        self._fresh: Dict[str, Tuple[float, int]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_run: Optional[float] = None
+        self.last_errors: Dict[str, str] = {}
+        # Daily partition maintenance (app/jobs/partitions.py), off unless enabled
+        self.maintenance = maintenance
+        self.last_maintenance: Optional[float] = None
+        self.last_maintenance_result: Optional[dict] = None
+
+    def track(self, city: str, days: int):
+        now = time.time()
+        with self._lock:
+            prev = self._hot.get(city)
+            self._hot[city] = (now, max(days, prev[1]) if prev else days)
+            if len(self._hot) > self.max_cities:
+                oldest = min(self._hot, key=lambda c: self._hot[c][0])
+                self._hot.pop(oldest, None)
+
+    def mark_fresh(self, city: str, days: int):
+        with self._lock:
+            self._fresh[city] = (time.time(), days)
+
+    def is_fresh(self, city: str, days: int) -> bool:
+        with self._lock:
+            entry = self._fresh.get(city)
+        return entry is not None and entry[1] >= days and (time.time() - entry[0]) < self.freshness
+
+    def hot_cities(self) -> List[Tuple[str, int]]:
+        cutoff = time.time() - self.track_ttl
+        with self._lock:
+            for city in [c for c, (at, _) in self._hot.items() if at < cutoff]:
+                self._hot.pop(city, None)
+            return [(c, d) for c, (_, d) in self._hot.items()]
+
+    def _refresh(self, city: str, days: int):
+        from ..db import SessionLocal
+        from ..services.scraper import ensure_window_for_city
+        db = SessionLocal()
+        try:
+            ensure_window_for_city(db, city, days)
+            self.mark_fresh(city, days)
+            self.last_errors.pop(city, None)
+        except Exception as e:
+            logger.warning("Scheduled refresh failed for %s: %s", city, e)
+            self.last_errors[city] = str(e)
+        finally:
+            db.close()
+
+    def run_once(self):
+        cities = self.hot_cities()
+        if cities:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="ingest") as pool:
+                list(pool.map(lambda cd: self._refresh(*cd), cities))
+        self.last_run = time.time()
+
+    def _maybe_maintain(self):
+        if not self.maintenance:
+            return
+        if self.last_maintenance is not None and time.time() - self.last_maintenance < 86400:
+            return
+        from .partitions import run_maintenance
+        self.last_maintenance_result = run_maintenance()
+        self.last_maintenance = time.time()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+                self._maybe_maintain()
+            except Exception as e:
+                logger.warning("Ingest scheduler run failed: %s", e)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="ingest-scheduler", daemon=True)
+        self._thread.start()
+        logger.info("Ingest scheduler started (every %ss, concurrency %s)", self.interval, self.concurrency)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def status(self) -> dict:
+        with self._lock:
+            hot = len(self._hot)
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "interval_s": self.interval,
+            "freshness_s": self.freshness,
+            "hot_cities": hot,
+            "last_run": self.last_run,
+            "errors": dict(self.last_errors),
+            "maintenance": self.last_maintenance_result if self.maintenance else None,
+        }
+
+
+# Config (env):
+#   INGEST_SCHEDULER         1 to run the background refresh loop (default 1)
+#   INGEST_REFRESH_SECONDS   refresh cadence for hot cities (default 900)
+#   INGEST_FRESHNESS_SECONDS how long an ingestion counts as fresh for /compare (default 900)
+#   INGEST_CONCURRENCY       parallel city refreshes (default 2)
+#   INGEST_TRACK_TTL_HOURS   how long a city stays hot after its last request (default 24)
+#   INGEST_MAX_CITIES        cap on tracked cities (default 50)
+#   PARTITION_MAINTENANCE    1 to also run partition maintenance once a day (default 0)
+scheduler = IngestScheduler(
+    interval=settings.INGEST_REFRESH_SECONDS,
+    freshness=settings.INGEST_FRESHNESS_SECONDS,
+    concurrency=settings.INGEST_CONCURRENCY,
+    track_ttl=settings.INGEST_TRACK_TTL_HOURS * 3600,
+    max_cities=settings.INGEST_MAX_CITIES,
+    maintenance=settings.PARTITION_MAINTENANCE,
+)
+
+
+def scheduler_enabled() -> bool:
+    return settings.INGEST_SCHEDULER
+
+
+def refresh_stale_cities(db, cities: List[str], days: int):
+    """
+    Request-path entry point for /compare and the agent: mark the cities hot and
+    scrape inline only those without a fresh enough ingestion; the rest are read
+    straight from measurements.
+    """
+    from ..services.canonical import resolve_cities
+    from ..services.scraper import ensure_windows_for_cities
+    # Track canonical names so every spelling of a city shares one entry
+    cities = list(dict.fromkeys(ref.name for ref in resolve_cities(db, cities).values()))
+    for city in cities:
+        scheduler.track(city, days)
+    stale = [c for c in cities if not scheduler.is_fresh(c, days)]
+    if stale:
+        ensure_windows_for_cities(db, stale, days)
+        for city in stale:
+            scheduler.mark_fresh(city, days)
@@ -1,23 +1,65 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 import logging
 
 from .core.config import settings
 from .core.logging_mw import log_requests
+from .core.wire import FastJSONResponse
 from .routers.compare import router as compare_router
 from .routers.forecast import router as forecast_router
 from .routers.agent import router as agent_router
 from .routers.health import router as health_router
 from .routers.report import router as report_router
 from .routers.auth import router as auth_router
+from .routers.cities import router as cities_router
+from .routers.series import router as series_router
+from .services.http_client import close_client
+from .services.geocode import preload_geocodes
+from .services.gazetteer import get_gazetteer
+from .jobs.scheduler import scheduler, scheduler_enabled
 
-app = FastAPI(title="AirQ (FastAPI + MySQL + MCP Bridge)")
+app = FastAPI(title="AirQ (FastAPI + MySQL + MCP Bridge)", default_response_class=FastJSONResponse)
 
 # Logging (basic)
 logger = logging.getLogger("airq")
 if not logger.handlers:
     logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
+@app.on_event("startup")
+def _check_schema():
+    from .db import engine
+    from .services.schema import verify_schema
+    try:
+        verify_schema(engine)
+    except Exception as e:
+        logger.warning("Schema check failed: %s", e)
+
+@app.on_event("startup")
+def _warm_geocodes():
+    get_gazetteer()
+    from .db import SessionLocal
+    db = SessionLocal()
+    try:
+        logger.info("Preloaded %s geocodes", preload_geocodes(db))
+    except Exception as e:
+        logger.warning("Geocode preload failed: %s", e)
+    finally:
+        db.close()
+
+@app.on_event("startup")
+def _start_scheduler():
+    if scheduler_enabled():
+        scheduler.start()
+
+@app.on_event("shutdown")
+def _stop_scheduler():
+    scheduler.stop()
+
+@app.on_event("shutdown")
+def _close_http_client():
+    close_client()
+
 # Request logging middleware
 app.middleware("http")(log_requests)
 
@@ -30,6 +72,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress responses above GZIP_MIN_BYTES for clients that accept gzip
+app.add_middleware(GZipMiddleware, minimum_size=settings.GZIP_MIN_BYTES)
+
 # Routers
 app.include_router(compare_router,  prefix="",       tags=["compare"])
 app.include_router(forecast_router, prefix="",       tags=["forecast"])
@@ -37,4 +82,6 @@ app.include_router(agent_router,    prefix="/agent", tags=["agent"])
 app.include_router(health_router,   prefix="",       tags=["health"])
 app.include_router(report_router,   prefix="",       tags=["report"])
 app.include_router(auth_router,     prefix="/auth",  tags=["auth"])
+app.include_router(cities_router,   prefix="",       tags=["cities"])
+app.include_router(series_router,   prefix="",       tags=["series"])
 
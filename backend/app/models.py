@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, BigInteger, Enum, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, BigInteger, Enum, ForeignKey, Float, Double, LargeBinary, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -31,3 +31,94 @@ class RefreshToken(Base):
     # Relationship to user
     user = relationship("User", back_populates="refresh_tokens")
 
+class Measurement(Base):
+    """
+    Hourly observations (only source='aggregated' is written today).
+    The (city, source, ts) primary key is the upsert key and, being the clustered
+    index, serves the per-city time-range scans without touching another index.
+    """
+    __tablename__ = "measurements"
+
+    city = Column(String(190), primary_key=True)
+    source = Column(String(32), primary_key=True)
+    ts = Column(DateTime, primary_key=True)
+    latitude = Column(Double, nullable=True)
+    longitude = Column(Double, nullable=True)
+    pm25 = Column(Double, nullable=True)
+    pm10 = Column(Double, nullable=True)
+
+class MeasurementDaily(Base):
+    """
+    Daily rollup of measurements: per-day count/sum/min/max/sum of squares, so
+    means and standard deviations can be recomputed over any set of days, and a
+    serialized quantile sketch per pollutant (services/sketch.py) that merges
+    into percentiles. Holds history past the hourly retention window.
+    """
+    __tablename__ = "measurements_daily"
+
+    city = Column(String(190), primary_key=True)
+    source = Column(String(32), primary_key=True)
+    day = Column(Date, primary_key=True)
+    n_hours = Column(Integer, nullable=False, default=0)
+    n_pm25 = Column(Integer, nullable=False, default=0)
+    sum_pm25 = Column(Double, nullable=True)
+    sumsq_pm25 = Column(Double, nullable=True)
+    min_pm25 = Column(Double, nullable=True)
+    max_pm25 = Column(Double, nullable=True)
+    n_pm10 = Column(Integer, nullable=False, default=0)
+    sum_pm10 = Column(Double, nullable=True)
+    sumsq_pm10 = Column(Double, nullable=True)
+    min_pm10 = Column(Double, nullable=True)
+    max_pm10 = Column(Double, nullable=True)
+    sketch_pm25 = Column(LargeBinary, nullable=True)
+    sketch_pm10 = Column(LargeBinary, nullable=True)
+
+class Geocode(Base):
+    __tablename__ = "geocodes"
+
+    city = Column(String(190), primary_key=True)
+    latitude = Column(Double, nullable=False)
+    longitude = Column(Double, nullable=False)
+
+class City(Base):
+    """Canonical city identity; measurements.city stores `name`."""
+    __tablename__ = "cities"
+
+    id = Column(String(190), primary_key=True)  # normalized name + rounded coordinates
+    name = Column(String(190), unique=True, nullable=False)
+    name_key = Column(String(190), index=True, nullable=False)
+    country = Column(String(2), nullable=True)
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class CityAlias(Base):
+    """Normalized user spelling -> canonical city."""
+    __tablename__ = "city_aliases"
+
+    alias = Column(String(190), primary_key=True)
+    city_id = Column(String(190), ForeignKey("cities.id", ondelete="CASCADE"), index=True, nullable=False)
+
+class RawSeries(Base):
+    """One (city, source) series of raw observations; measurements_raw rows point here."""
+    __tablename__ = "raw_series"
+    __table_args__ = (UniqueConstraint("city", "source", name="uq_raw_series_city_source"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    city = Column(String(190), nullable=False)
+    source = Column(String(32), nullable=False)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+
+class MeasurementRaw(Base):
+    """
+    Raw per-source hourly observations, ~16 bytes of payload per row:
+    series id, epoch hour and single-precision pollutant values.
+    """
+    __tablename__ = "measurements_raw"
+
+    series_id = Column(Integer, ForeignKey("raw_series.id", ondelete="CASCADE"), primary_key=True, autoincrement=False)
+    ts_hour = Column(Integer, primary_key=True, autoincrement=False)  # hours since 1970-01-01 UTC
+    pm25 = Column(Float(precision=24), nullable=True)  # FLOAT, not DOUBLE
+    pm10 = Column(Float(precision=24), nullable=True)
+
@@ -5,6 +5,7 @@ from ..schemas import AgentPlanIn, AgentPlanOut, ToolStep, AgentExecIn, AgentExe
 from ..core.security import get_plan, Plan
 from ..core.tiers import enforce_scrape, enforce_compare, enforce_forecast
 from ..services.scraper import ensure_window_for_city
+from ..jobs.scheduler import refresh_stale_cities
 from ..services.forecast import forecast_city, forecast_cities
 from ..services.llama_client import plan_with_llama
 from ..utils.compare import compare_logic
@@ -20,7 +21,7 @@ TOOLS = [
     },
     {
         "name": "compare_cities",
-        "description": "Compute KPIs over the last N days per city (n_points, mean_pm25, min_pm25, max_pm25) and pick best/worst (lower is better).",
+        "description": "Compute KPIs over the last N days per city (n_points, mean/min/max/std and p50/p95/p99 of pm25 and pm10) and pick best/worst (lower is better).",
         "input_schema": {"type":"object","properties":{"cities":{"type":"array","items":{"type":"string"}},"days":{"type":"integer","minimum":1,"maximum":90,"default":7}},"required":["cities"]},
         "output_schema": {"type":"object"}
     },
@@ -55,7 +56,7 @@ def mcp_call_tool(call: dict, request: Request, plan: Plan = Depends(get_plan),
     if name == "compare_cities":
         cities = args["cities"]; days = args.get("days", 7)
         enforce_compare(plan, cities, days)
-        for c in cities: ensure_window_for_city(db, c, days)
+        refresh_stale_cities(db, cities, days)
         return {"ok": True, "result": compare_logic(db, cities, days)}
 
     if name == "forecast_city":
@@ -92,7 +93,7 @@ def _execute_step(db: Session, plan: Plan, step: ToolStep):
     if name == "compare_cities":
         cities = args["cities"]; days = args.get("days", 7)
         enforce_compare(plan, cities, days)
-        for c in cities: ensure_window_for_city(db, c, days)
+        refresh_stale_cities(db, cities, days)
         res = compare_logic(db, cities, days)
         return {"tool": name, "ok": True, "args": args, "result": res}
 
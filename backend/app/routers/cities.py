@@ -0,0 +1,12 @@
+from fastapi import APIRouter, HTTPException, Query
+
+from ..services.gazetteer import get_gazetteer
+
+router = APIRouter()
+
+@router.get("/cities/search")
+def search_cities(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=50)):
+    gaz = get_gazetteer()
+    if gaz is None:
+        raise HTTPException(503, "Gazetteer not configured (set GAZETTEER_PATH)")
+    return {"ok": True, "query": q, "results": gaz.search(q, limit)}
@@ -1,29 +1,41 @@
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from ..db import get_db
 from ..schemas import CityWindowIn, CompareIn
 from ..core.security import get_plan, Plan
 from ..core.tiers import enforce_scrape, enforce_compare
+from ..core.wire import wants_columnar, columnar_table
 import os
-from ..services.scraper import ensure_window_for_city, ensure_window_for_city_with_counts
+from ..services.canonical import resolve_city
+from ..services.scraper import ensure_window_for_city, ensure_window_for_city_with_counts, sum_counts
 from ..utils.compare import compare_logic
+from ..jobs.scheduler import scheduler, refresh_stale_cities
 
 router = APIRouter()
 
 @router.post("/scrape")
 def scrape_city(payload: CityWindowIn, request: Request, plan: Plan = Depends(get_plan), db: Session = Depends(get_db)):
     enforce_scrape(plan, payload.days)
+    # Same canonical key as refresh_stale_cities, so a scrape counts as fresh for /compare
+    name = resolve_city(db, payload.city).name
+    scheduler.track(name, payload.days)
     inserted, (lat, lon) = ensure_window_for_city(db, payload.city, payload.days, payload.sources)
+    if not payload.sources:
+        scheduler.mark_fresh(name, payload.days)
     return {"ok": True, "city": payload.city, "inserted": inserted, "lat": lat, "lon": lon}
 
 @router.post("/compare")
-def compare_cities(payload: CompareIn, request: Request, plan: Plan = Depends(get_plan), db: Session = Depends(get_db)):
+def compare_cities(payload: CompareIn, request: Request, format: Optional[str] = None, plan: Plan = Depends(get_plan), db: Session = Depends(get_db)):
     if not payload.cities:
         raise HTTPException(400, "No cities provided")
     enforce_compare(plan, payload.cities, payload.days)
-    for c in payload.cities:
-        ensure_window_for_city(db, c, payload.days, None)
-    return {"ok": True, **compare_logic(db, payload.cities, payload.days)}
+    refresh_stale_cities(db, payload.cities, payload.days)
+    result = compare_logic(db, payload.cities, payload.days)
+    if wants_columnar(format):
+        result["byCity"] = columnar_table(result["byCity"])
+    return {"ok": True, **result}
 
 
 @router.post("/scrape/aggregate")
@@ -40,8 +52,9 @@ def scrape_city_aggregate(payload: CityWindowIn, request: Request, plan: Plan =
         "city": payload.city,
         "lat": lat,
         "lon": lon,
-        "inserted": sum(counts.values()),
+        "inserted": sum_counts(counts),
         "counts": counts,
         "sources_enabled": sources_enabled,
         "aggregated": counts.get('aggregated', 0),
+        "timed_out": counts.get('timed_out', []),
     }
@@ -1,17 +1,24 @@
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from ..db import get_db
 from ..schemas import ForecastIn, ForecastMultiIn
 from ..core.security import get_plan, Plan
 from ..core.tiers import enforce_forecast
+from ..core.wire import wants_columnar, columnar_series
 from ..services.forecast import forecast_city, fit_and_save_model, backtest_roll, forecast_cities
 
 router = APIRouter()
 
+FORECAST_FIELDS = ("yhat", "yhat_lower", "yhat_upper")
+
 @router.post("/forecast")
-def forecast(payload: ForecastIn, request: Request, plan: Plan = Depends(get_plan), db: Session = Depends(get_db)):
+def forecast(payload: ForecastIn, request: Request, format: Optional[str] = None, plan: Plan = Depends(get_plan), db: Session = Depends(get_db)):
     enforce_forecast(plan, payload.horizonDays, 1)
     result = forecast_city(db, payload.city, payload.horizonDays, payload.trainDays, payload.use_cache)
+    if wants_columnar(format):
+        result["series"] = columnar_series(result["series"], FORECAST_FIELDS)
     return {"ok": True, **result}
 
 @router.post("/forecast/train")
@@ -25,9 +32,12 @@ def forecast_backtest(city: str, days: int = 30, horizonHours: int = 24, db: Ses
     return {"ok": True, **stats}
 
 @router.post("/forecast/multi")
-def forecast_multi(payload: ForecastMultiIn, request: Request, plan: Plan = Depends(get_plan), db: Session = Depends(get_db)):
+def forecast_multi(payload: ForecastMultiIn, request: Request, format: Optional[str] = None, plan: Plan = Depends(get_plan), db: Session = Depends(get_db)):
     if not payload.cities:
         raise HTTPException(400, "No cities provided")
     enforce_forecast(plan, payload.horizonDays, len(payload.cities))
     out = forecast_cities(db, payload.cities, payload.horizonDays, payload.trainDays, payload.use_cache)
+    if wants_columnar(format):
+        out["byCity"] = {c: columnar_series(s, FORECAST_FIELDS) if isinstance(s, list) else s
+                         for c, s in out["byCity"].items()}
     return {"ok": True, **out, "horizonDays": payload.horizonDays}
@@ -2,9 +2,13 @@ from fastapi import APIRouter, Depends
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-import requests
 
 from ..db import get_db
+from ..services.http_client import get_client
+from ..services.upstream_cache import get_cache
+from ..services.singleflight import ingest_flight
+from ..services.breaker import breaker_status
+from ..jobs.scheduler import scheduler
 
 router = APIRouter()
 
@@ -25,10 +29,11 @@ def healthz(db: Session = Depends(get_db)):
 
     # Make upstream check non-blocking with shorter timeout
     try:
-        r = requests.get(
+        r = get_client().get(
             "https://air-quality-api.open-meteo.com/v1/air-quality"
             "?latitude=0&longitude=0&hourly=pm2_5&start_date=2025-01-01&end_date=2025-01-02",
-            timeout=2  # Reduced timeout to prevent hanging
+            timeout=2,  # Reduced timeout to prevent hanging
+            retries=0,
         )
         upstream_ok = r.status_code < 500
         if not upstream_ok:
@@ -36,10 +41,15 @@ def healthz(db: Session = Depends(get_db)):
     except Exception as e:
         upstream_ok, up_err = False, str(e)
 
+    cache = get_cache()
+
     # Return ok status even if upstream is down - only fail if DB is down
     status = "ok" if db_ok else "degraded"
     return JSONResponse({
         "status": status,
         "db": {"ok": db_ok, "error": db_err},
-        "upstream": {"ok": upstream_ok, "error": up_err}
+        "upstream": {"ok": upstream_ok, "error": up_err, "sources": breaker_status()},
+        "cache": cache.stats() if cache is not None else {"enabled": False},
+        "scheduler": scheduler.status(),
+        "ingest": ingest_flight().stats(),
     })
@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.orm import Session
+
+from ..core.security import get_plan, Plan
+from ..core.tiers import enforce_compare
+from ..core.wire import wants_columnar, columnar_series
+from ..db import get_db
+from ..schemas import SeriesIn
+from ..services.canonical import resolve_cities
+from ..services.series import load_series
+
+router = APIRouter()
+
+@router.post("/series")
+def series(payload: SeriesIn, request: Request, format: Optional[str] = None, plan: Plan = Depends(get_plan), db: Session = Depends(get_db)):
+    if not payload.cities:
+        raise HTTPException(400, "No cities provided")
+    enforce_compare(plan, payload.cities, payload.days)
+    # Whole hours: the current partial hour is included, nothing past it
+    hi = datetime.utcnow().replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    lo = hi - timedelta(days=payload.days)
+    refs = resolve_cities(db, payload.cities, create=False)
+    names = list(dict.fromkeys(refs[c].name for c in payload.cities))
+    data = load_series(db, names, lo, hi, payload.resolution, payload.maxPoints)
+    if wants_columnar(format):
+        data = {n: columnar_series(s, ("pm25", "pm10", "n")) for n, s in data.items()}
+    return {
+        "ok": True,
+        "days": payload.days,
+        "resolution": payload.resolution,
+        "maxPoints": payload.maxPoints,
+        "series": {c: data[refs[c].name] for c in payload.cities},
+    }
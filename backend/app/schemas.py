@@ -11,6 +11,12 @@ class CompareIn(BaseModel):
     cities: list[str]
     days: conint(ge=1, le=90) = 7
 
+class SeriesIn(BaseModel):
+    cities: list[str]
+    days: conint(ge=1, le=90) = 7
+    resolution: Literal["hour", "day", "week"] = "hour"
+    maxPoints: Optional[conint(ge=3, le=10000)] = None  # LTTB-downsample each city to at most this many points
+
 class ForecastIn(BaseModel):
     city: str
     horizonDays: conint(ge=1, le=30) = 7
@@ -1,6 +1,10 @@
 import os
 import logging
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Optional, Tuple, Union
+
+import numpy as np
+
+from .fetchers.frame import HourlyFrame, as_frame
 
 
 logger = logging.getLogger(__name__)
@@ -25,118 +29,128 @@ def _parse_weights(env_val: Optional[str]) -> Dict[str, float]:
     return weights
 
 
-def _zscore_trim(values: List[Tuple[float, float]], z: float) -> List[Tuple[float, float]]:
-    # values as (x, weight)
-    if not values:
-        return values
-    xs = [x for x, _ in values]
-    mean = sum(xs) / len(xs)
-    var = sum((x - mean) ** 2 for x in xs) / max(1, len(xs) - 1)
-    std = var ** 0.5
-    if std == 0:
-        return values
-    kept: List[Tuple[float, float]] = []
-    for x, w in values:
-        if abs((x - mean) / std) <= z:
-            kept.append((x, w))
-    return kept
-
-
-def _iqr_trim(values: List[Tuple[float, float]], k: float) -> List[Tuple[float, float]]:
-    if not values:
-        return values
-    xs = sorted(x for x, _ in values)
-    n = len(xs)
-    if n < 4:
-        return values
-    q1 = xs[n // 4]
-    q3 = xs[(3 * n) // 4]
-    iqr = q3 - q1
-    lo = q1 - k * iqr
-    hi = q3 + k * iqr
-    kept: List[Tuple[float, float]] = []
-    for x, w in values:
-        if lo <= x <= hi:
-            kept.append((x, w))
-    return kept
-
-
-def _maybe_trim(values: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
-    # Config: AGG_TRIM (0/1), AGG_TRIM_METHOD (zscore|iqr), AGG_Z (default 3.0), AGG_IQR_K (default 1.5)
-    if not values:
-        return values
+def _trim_config() -> Tuple[Optional[str], float]:
+    """
+    Read trimming settings once per aggregation run.
+    Config: AGG_TRIM (0/1), AGG_TRIM_METHOD (zscore|iqr), AGG_Z (default 3.0), AGG_IQR_K (default 1.5)
+    Returns (method or None when trimming is off, threshold).
+    """
     try:
         do_trim = os.getenv('AGG_TRIM', '0') in ('1', 'true', 'True')
         if not do_trim:
-            return values
+            return None, 0.0
         method = os.getenv('AGG_TRIM_METHOD', 'zscore').lower()
         if method == 'iqr':
-            k = float(os.getenv('AGG_IQR_K', '1.5'))
-            return _iqr_trim(values, k)
-        else:
-            z = float(os.getenv('AGG_Z', '3.0'))
-            return _zscore_trim(values, z)
+            return 'iqr', float(os.getenv('AGG_IQR_K', '1.5'))
+        return 'zscore', float(os.getenv('AGG_Z', '3.0'))
     except Exception:
-        return values
-
+        return None, 0.0
 
-def _weighted_mean(values: List[Tuple[float, float]]) -> Optional[float]:
-    if not values:
-        return None
-    num = sum(x * w for x, w in values)
-    den = sum(w for _, w in values)
-    if den == 0:
-        return None
-    return num / den
 
-
-def combine_by_timestamp(city: str, lat: float, lon: float, *sources_rows: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+def _align(frames: List[HourlyFrame], weights_cfg: Dict[str, float]):
     """
-    Merge rows from multiple sources by ts and compute (weighted) means.
-    Returns rows with source='aggregated'.
-    Each input row is expected to have: ts (str or datetime), city, latitude, longitude, pm25, pm10, source
+    Lay all observations out as a (slots x hours) matrix per pollutant.
+    Each source gets one row per repeat of an hour, so a source that reports the
+    same hour twice keeps both values, in their original order.
+    Returns (hours, pm25 matrix, pm10 matrix, per-row weights); missing cells are NaN.
     """
-    weights_cfg = _parse_weights(os.getenv('AGG_WEIGHTS'))
-    by_ts: Dict[str, Dict[str, List[Tuple[float, float]]]] = {}
-
-    for rows in sources_rows:
-        for r in rows or []:
-            ts = str(r.get('ts'))
-            source = str(r.get('source') or '').lower()
-            w = float(weights_cfg.get(source, 1.0))
-            bucket = by_ts.setdefault(ts, {"pm25": [], "pm10": []})
-            try:
-                pm25 = r.get('pm25')
-                if pm25 is not None:
-                    bucket['pm25'].append((float(pm25), w))
-            except Exception:
-                pass
-            try:
-                pm10 = r.get('pm10')
-                if pm10 is not None:
-                    bucket['pm10'].append((float(pm10), w))
-            except Exception:
-                pass
-
-    out: List[Dict[str, Any]] = []
-    for ts, measures in by_ts.items():
-        vals25 = _maybe_trim(measures.get('pm25', []))
-        vals10 = _maybe_trim(measures.get('pm10', []))
-        mean25 = _weighted_mean(vals25)
-        mean10 = _weighted_mean(vals10)
-        if mean25 is None and mean10 is None:
-            continue
-        out.append({
-            'ts': ts,
-            'city': city,
-            'latitude': lat,
-            'longitude': lon,
-            'pm25': mean25,
-            'pm10': mean10,
-            'source': 'aggregated',
-        })
-
-    return out
-
+    hours = np.unique(np.concatenate([f.hours for f in frames]))
+    placements = []
+    n_rows = 0
+    for f in frames:
+        order = np.argsort(f.hours, kind='stable')
+        sorted_h = f.hours[order]
+        first = np.searchsorted(sorted_h, sorted_h, side='left')
+        rank = np.empty(len(f), dtype=np.int64)
+        rank[order] = np.arange(len(f)) - first
+        placements.append((f, n_rows + rank, np.searchsorted(hours, f.hours)))
+        n_rows += int(rank.max()) + 1
+
+    x25 = np.full((n_rows, hours.size), np.nan)
+    x10 = np.full((n_rows, hours.size), np.nan)
+    weights = np.empty(n_rows)
+    row = 0
+    for f, rows, cols in placements:
+        x25[rows, cols] = f.pm25
+        x10[rows, cols] = f.pm10
+        n = int(rows.max()) + 1 - row
+        weights[row:row + n] = float(weights_cfg.get(str(f.source or '').lower(), 1.0))
+        row += n
+    return hours, x25, x10, weights
+
+
+def _zscore_keep(x: np.ndarray, valid: np.ndarray, z: float) -> np.ndarray:
+    n = valid.sum(axis=0)
+    mean = np.where(valid, x, 0.0).sum(axis=0) / np.maximum(n, 1)
+    dev = np.where(valid, x - mean, 0.0)
+    var = (dev * dev).sum(axis=0) / np.maximum(1, n - 1)
+    std = np.sqrt(var)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        score = np.abs((x - mean) / std)
+    keep = valid & ((std == 0) | (score <= z))
+
+    # Squares and square roots here can differ from Python's float ** by an ulp, so
+    # re-decide the rare columns with a value sitting right on the threshold using
+    # the scalar formula; everything else is already bit-identical.
+    edge = valid & (std != 0) & (np.abs(score - z) <= 1e-9 * max(abs(z), 1.0))
+    for col in np.unique(np.nonzero(edge)[1]).tolist():
+        xs = x[valid[:, col], col].tolist()
+        m = sum(xs) / len(xs)
+        s = (sum((v - m) ** 2 for v in xs) / max(1, len(xs) - 1)) ** 0.5
+        with np.errstate(invalid='ignore'):
+            keep[:, col] = valid[:, col] & (np.abs((x[:, col] - m) / s) <= z)
+    return keep
+
+
+def _iqr_keep(x: np.ndarray, valid: np.ndarray, k: float) -> np.ndarray:
+    n = valid.sum(axis=0)
+    xs = np.sort(x, axis=0)  # NaN sorts last, so the first n cells of each column are its values
+    cols = np.arange(x.shape[1])
+    q1 = xs[np.minimum(n // 4, x.shape[0] - 1), cols]
+    q3 = xs[np.minimum((3 * n) // 4, x.shape[0] - 1), cols]
+    iqr = q3 - q1
+    lo = q1 - k * iqr
+    hi = q3 + k * iqr
+    with np.errstate(invalid='ignore'):
+        inside = (lo <= x) & (x <= hi)
+    return valid & ((n < 4) | inside)
+
+
+def _weighted_means(x: np.ndarray, weights: np.ndarray, method: Optional[str], threshold: float) -> np.ndarray:
+    """Per-hour trimmed weighted mean; NaN where nothing (or zero weight) is left."""
+    valid = ~np.isnan(x)
+    if method == 'iqr':
+        keep = _iqr_keep(x, valid, threshold)
+    elif method == 'zscore':
+        keep = _zscore_keep(x, valid, threshold)
+    else:
+        keep = valid
+    w = weights[:, None]
+    num = np.where(keep, x * w, 0.0).sum(axis=0)
+    den = np.where(keep, w, 0.0).sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(den != 0, num / den, np.nan)
+
+
+def combine_by_timestamp(city: str, lat: float, lon: float,
+                         *sources_rows: Union[HourlyFrame, List[Dict[str, Any]], None]) -> HourlyFrame:
+    """
+    Merge observations from multiple sources by hour and compute (weighted) means.
+    Each positional argument is one source, either an HourlyFrame or legacy row
+    dicts (ts, city, latitude, longitude, pm25, pm10, source); None is skipped.
+    Sources are aligned into a sources-by-hours matrix and trimmed / averaged
+    column-wise; values are summed in source order, as the scalar version did.
+    Returns an HourlyFrame with source='aggregated', ordered by hour.
+    """
+    frames = [f for f in (as_frame(rows) for rows in sources_rows) if f is not None]
+    if not frames:
+        return HourlyFrame.empty(city, lat, lon, 'aggregated')
 
+    weights_cfg = _parse_weights(os.getenv('AGG_WEIGHTS'))
+    method, threshold = _trim_config()
+    hours, x25, x10, weights = _align(frames, weights_cfg)
 
+    mean25 = _weighted_means(x25, weights, method, threshold)
+    mean10 = _weighted_means(x10, weights, method, threshold)
+    keep = ~(np.isnan(mean25) & np.isnan(mean10))
+    return HourlyFrame(hours[keep], mean25[keep], mean10[keep], city, lat, lon, 'aggregated')
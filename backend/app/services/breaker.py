@@ -0,0 +1,179 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+import requests
+
+from ..core.config import settings
+from .http_client import get_client
+
+
+logger = logging.getLogger(__name__)
+
+# Statuses that mean the upstream is unhealthy or blocking us (a 404 is just a bad slug)
+FAILURE_STATUSES = {403, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class SourceBreaker:
+    """
+    Health tracker for one upstream: a circuit breaker plus latency-derived timeouts.
+
+    closed     requests flow; `threshold` consecutive failures open the breaker
+    open       requests are refused without touching the network until the cooldown passes
+    half-open  one probe request is let through; success closes the breaker, failure
+               re-opens it with the cooldown doubled (up to `max_cooldown`)
+
+    timeout() is `factor` x the p95 of recent successful latencies, clamped to
+    [min_timeout, default_timeout]; until enough samples exist it is default_timeout.
+    """
+
+    MIN_SAMPLES = 5
+
+    def __init__(self, name: str, default_timeout: float, threshold: int, cooldown: float,
+                 max_cooldown: float, min_timeout: float, factor: float, window: int = 50):
+        self.name = name
+        self.default_timeout = default_timeout
+        self.threshold = max(1, threshold)
+        self.base_cooldown = cooldown
+        self.max_cooldown = max(cooldown, max_cooldown)
+        self.min_timeout = min(min_timeout, default_timeout)
+        self.factor = factor
+        self._lock = threading.Lock()
+        self._latencies: deque = deque(maxlen=window)
+        self.state = "closed"
+        self.failures = 0
+        self.cooldown = cooldown
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.time() - self.opened_at >= self.cooldown:
+                self.state = "half-open"
+            if self.state == "half-open" and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
+            if self.state != "closed":
+                logger.info("Upstream %s recovered, closing breaker", self.name)
+            self.state = "closed"
+            self.failures = 0
+            self.cooldown = self.base_cooldown
+            self._probing = False
+
+    def record_failure(self, error: str):
+        with self._lock:
+            self.failures += 1
+            self.last_error = error
+            if self.state == "half-open":
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+                self._open()
+            elif self.state == "closed" and self.failures >= self.threshold:
+                self._open()
+
+    def _open(self):
+        self.state = "open"
+        self.opened_at = time.time()
+        self._probing = False
+        logger.warning("Upstream %s unhealthy (%s failures), breaker open for %ss",
+                       self.name, self.failures, self.cooldown)
+
+    def timeout(self) -> float:
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < self.MIN_SAMPLES:
+            return self.default_timeout
+        p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+        return max(self.min_timeout, min(self.default_timeout, p95 * self.factor))
+
+    def retries(self) -> Optional[int]:
+        # No retries once the source has started failing (or while probing); None = client default
+        with self._lock:
+            return None if self.state == "closed" and self.failures == 0 else 0
+
+    def status(self) -> Dict[str, Any]:
+        timeout = self.timeout()
+        with self._lock:
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "cooldown_s": self.cooldown,
+                "open_for_s": (round(max(0.0, self.cooldown - (time.time() - self.opened_at)), 1)
+                               if self.state == "open" else None),
+                "timeout_s": round(timeout, 2),
+                "samples": len(self._latencies),
+                "rejected": self.rejected,
+                "last_error": self.last_error,
+            }
+
+
+_breakers: Dict[str, SourceBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str, default_timeout: float) -> SourceBreaker:
+    """
+    Shared breaker per upstream name. `default_timeout` is the upper bound the
+    adaptive timeout works under.
+    Config (env): BREAKER_FAILURES consecutive failures to open (default 3),
+    BREAKER_COOLDOWN seconds before a probe (default 60), BREAKER_MAX_COOLDOWN (default 600),
+    ADAPTIVE_TIMEOUT_MIN floor in seconds (default 2), ADAPTIVE_TIMEOUT_FACTOR p95 multiplier (default 3).
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = SourceBreaker(
+                name,
+                default_timeout,
+                threshold=settings.BREAKER_FAILURES,
+                cooldown=settings.BREAKER_COOLDOWN,
+                max_cooldown=settings.BREAKER_MAX_COOLDOWN,
+                min_timeout=settings.ADAPTIVE_TIMEOUT_MIN,
+                factor=settings.ADAPTIVE_TIMEOUT_FACTOR,
+            )
+        return breaker
+
+
+def guarded_get(breaker: SourceBreaker, url: str, params: Optional[Dict[str, Any]] = None,
+                headers: Optional[Dict[str, Any]] = None) -> requests.Response:
+    """
+    GET through the shared client on behalf of `breaker`'s upstream, using its
+    adaptive timeout and recording the outcome. Retries and backoff are the
+    client's; fetchers only decide what to do with the response. Raises
+    CircuitOpenError without any network call while the breaker is open.
+    """
+    if not breaker.allow():
+        raise CircuitOpenError(f"{breaker.name} circuit open")
+    started = time.monotonic()
+    try:
+        resp = get_client().get(url, params=params, headers=headers,
+                                timeout=breaker.timeout(), retries=breaker.retries())
+    except Exception as e:
+        breaker.record_failure(str(e))
+        raise
+    if resp.status_code in FAILURE_STATUSES:
+        breaker.record_failure(f"HTTP {resp.status_code}")
+    else:
+        breaker.record_success(time.monotonic() - started)
+    return resp
+
+
+def breaker_status() -> Dict[str, Dict[str, Any]]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.status() for b in breakers}
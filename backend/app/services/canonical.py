@@ -0,0 +1,141 @@
+import re
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .gazetteer import get_gazetteer, normalize_name
+
+
+# Two spellings resolve to the same city when their names normalize the same
+# and their coordinates are within this many degrees (~25 km).
+SAME_PLACE_DEGREES = 0.25
+
+
+class CityRef(NamedTuple):
+    id: str    # stable key for caches and model files, e.g. "colombo_6.93_79.85"
+    name: str  # the value stored in measurements.city / geocodes.city
+
+
+# The suffixes _create adds to tell same-named places apart
+_QUALIFIER = re.compile(r"(, [A-Z]{2}| \(-?\d+\.\d{2}, -?\d+\.\d{2}\))$")
+
+_by_alias: Dict[str, CityRef] = {}
+_lock = threading.Lock()
+
+
+def alias_key(city: str) -> str:
+    return normalize_name(city)
+
+
+def _city_id(name_key: str, lat: float, lon: float) -> str:
+    return f"{name_key.replace(' ', '_')}_{lat:.2f}_{lon:.2f}"
+
+
+def fetch_name(name: str) -> str:
+    """The place name to send upstream for a canonical name: 'Paris, US' -> 'Paris'."""
+    return _QUALIFIER.sub("", name) or name
+
+
+def _fallback(city: str) -> CityRef:
+    """Identity for a name with no canonical entry yet (read paths never create one)."""
+    name = " ".join(city.split())
+    return CityRef(alias_key(city).replace(" ", "_") or name, name)
+
+
+def _lookup_alias(db: Session, key: str) -> Optional[CityRef]:
+    ref = _by_alias.get(key)
+    if ref is not None:
+        return ref
+    row = db.execute(
+        text("SELECT c.id, c.name FROM city_aliases a JOIN cities c ON c.id = a.city_id WHERE a.alias = :a"),
+        {"a": key},
+    ).fetchone()
+    if row is None:
+        return None
+    ref = CityRef(row[0], row[1])
+    with _lock:
+        _by_alias[key] = ref
+    return ref
+
+
+def _create(db: Session, city: str, key: str) -> CityRef:
+    from .geocode import get_coords_for_city, store_coords
+
+    base, _, country = city.partition(",")
+    name = " ".join(base.split())
+    country = country.strip().upper() if len(country.strip()) == 2 else None
+
+    gaz = get_gazetteer()
+    entry = gaz.find(city) if gaz is not None else None
+    if entry is not None:
+        name, country = str(entry["name"]), str(entry["country"]) or country
+        lat, lon = float(entry["latitude"]), float(entry["longitude"])
+    else:
+        # Keep the qualifier: 'Paris, US' must not geocode to France, and a
+        # country the geocoder cannot match rejects the name
+        lat, lon = get_coords_for_city(db, f"{name}, {country}" if country else name)
+    name_key = normalize_name(name) or key
+
+    # Same place under another spelling?
+    rows = db.execute(
+        text("SELECT id, name, latitude, longitude FROM cities WHERE name_key = :k"),
+        {"k": name_key},
+    ).fetchall()
+    ref = next((CityRef(r[0], r[1]) for r in rows
+                if abs(r[2] - lat) <= SAME_PLACE_DEGREES and abs(r[3] - lon) <= SAME_PLACE_DEGREES), None)
+
+    if ref is None:
+        # A different place with the same name keeps its name; this one gets qualified
+        if rows:
+            name = f"{name}, {country}" if country else f"{name} ({lat:.2f}, {lon:.2f})"
+        ref = CityRef(_city_id(name_key, lat, lon), name)
+        db.execute(
+            text("""
+                INSERT IGNORE INTO cities (id, name, name_key, country, latitude, longitude, created_at)
+                VALUES (:id, :name, :k, :country, :lat, :lon, UTC_TIMESTAMP())
+            """),
+            {"id": ref.id, "name": ref.name, "k": name_key, "country": country, "lat": lat, "lon": lon},
+        )
+        # Also answer to the canonical spelling itself
+        db.execute(text("INSERT IGNORE INTO city_aliases (alias, city_id) VALUES (:a, :id)"),
+                   {"a": alias_key(ref.name), "id": ref.id})
+        # Ingest looks coordinates up by the canonical name; a qualified name must
+        # not go to the geocoder, and gazetteer hits are not stored anywhere else
+        store_coords(db, ref.name, lat, lon)
+
+    db.execute(text("INSERT IGNORE INTO city_aliases (alias, city_id) VALUES (:a, :id)"),
+               {"a": key, "id": ref.id})
+    db.commit()
+    # Re-read so concurrent creators converge on whichever row won
+    return _lookup_alias(db, key) or ref
+
+
+def resolve_city(db: Session, city: str, create: bool = True) -> CityRef:
+    """
+    Canonical identity for a user-supplied city string.
+
+    'Colombo', 'colombo ' and 'Colombo, LK' all map to one CityRef through the
+    city_aliases table (cached in process). Unknown spellings are geocoded
+    (gazetteer first) and either attached to an existing city at the same place
+    or registered as a new one. With create=False (read paths) nothing is
+    geocoded or written and unknown names fall back to their cleaned spelling.
+    """
+    key = alias_key(city)
+    if not key:
+        return _fallback(city)
+    ref = _lookup_alias(db, key)
+    if ref is not None:
+        return ref
+    if not create:
+        return _fallback(city)
+    ref = _create(db, city, key)
+    with _lock:
+        _by_alias[key] = ref
+    return ref
+
+
+def resolve_cities(db: Session, cities: List[str], create: bool = True) -> Dict[str, CityRef]:
+    """{input spelling: CityRef}, in input order."""
+    return {city: resolve_city(db, city, create) for city in dict.fromkeys(cities)}
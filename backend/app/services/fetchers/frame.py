@@ -0,0 +1,139 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .normalize import align_to_hour, clean_pollutant, parse_ts, safe_float
+
+
+class HourlyFrame:
+    """
+    Columnar hourly observations for one source at one place.
+
+    `hours` holds epoch hours (int64, naive timestamps are taken as UTC, as in
+    align_to_hour); `pm25` / `pm10` are float64 with NaN for missing.
+    city / latitude / longitude / source are stored once per frame instead of per row.
+    """
+
+    __slots__ = ("hours", "pm25", "pm10", "city", "latitude", "longitude", "source")
+
+    def __init__(self, hours, pm25, pm10, city: str, latitude: Optional[float],
+                 longitude: Optional[float], source: str):
+        self.hours = np.asarray(hours, dtype=np.int64)
+        self.pm25 = np.asarray(pm25, dtype=np.float64)
+        self.pm10 = np.asarray(pm10, dtype=np.float64)
+        self.city = city
+        self.latitude = safe_float(latitude)
+        self.longitude = safe_float(longitude)
+        self.source = source
+
+    def __len__(self) -> int:
+        return int(self.hours.shape[0])
+
+    def __repr__(self) -> str:
+        return f"HourlyFrame(source={self.source!r}, city={self.city!r}, n={len(self)})"
+
+    @classmethod
+    def empty(cls, city: str, latitude: Optional[float], longitude: Optional[float], source: str) -> "HourlyFrame":
+        return cls(np.empty(0, np.int64), np.empty(0), np.empty(0), city, latitude, longitude, source)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Dict[str, Any]], source: Optional[str] = None) -> "HourlyFrame":
+        """Build a frame from legacy row dicts (ts, city, latitude, longitude, pm25, pm10, source)."""
+        first = rows[0] if rows else {}
+        b = FrameBuilder(first.get("city"), first.get("latitude"), first.get("longitude"),
+                         source or str(first.get("source") or ""), clean=False)
+        for r in rows:
+            b.append(r.get("ts"), safe_float(r.get("pm25")), safe_float(r.get("pm10")))
+        return b.build()
+
+    @classmethod
+    def concat(cls, frames: Iterable["HourlyFrame"]) -> Optional["HourlyFrame"]:
+        """Concatenate frames of the same source; metadata comes from the first frame."""
+        frames = [f for f in frames if f is not None]
+        if not frames:
+            return None
+        first = frames[0]
+        return cls(np.concatenate([f.hours for f in frames]),
+                   np.concatenate([f.pm25 for f in frames]),
+                   np.concatenate([f.pm10 for f in frames]),
+                   first.city, first.latitude, first.longitude, first.source)
+
+    def ts_strings(self) -> List[str]:
+        """MySQL DATETIME strings for every hour, vectorized."""
+        iso = np.datetime_as_string(self.hours.astype("datetime64[h]"), unit="s")
+        return [s.replace("T", " ") for s in iso.tolist()]
+
+    def to_rows(self) -> List[Dict[str, Any]]:
+        """Expand to row dicts, e.g. for DB parameter binding."""
+        pm25 = [None if np.isnan(v) else v for v in self.pm25.tolist()]
+        pm10 = [None if np.isnan(v) else v for v in self.pm10.tolist()]
+        return [
+            {
+                "ts": ts,
+                "city": self.city,
+                "latitude": self.latitude,
+                "longitude": self.longitude,
+                "pm25": a,
+                "pm10": b,
+                "source": self.source,
+            }
+            for ts, a, b in zip(self.ts_strings(), pm25, pm10)
+        ]
+
+
+def to_epoch_hour(ts: datetime) -> int:
+    return int(align_to_hour(ts).timestamp()) // 3600
+
+
+def iso_hours(values: Sequence[str]) -> np.ndarray:
+    """Epoch hours for naive ISO strings such as Open-Meteo's 'YYYY-MM-DDTHH:MM'."""
+    return np.array(values, dtype="datetime64[m]").astype("datetime64[h]").astype(np.int64)
+
+
+class FrameBuilder:
+    """Accumulates (ts, pm25, pm10) observations and builds an HourlyFrame."""
+
+    def __init__(self, city: str, latitude: Optional[float], longitude: Optional[float], source: str,
+                 clean: bool = True):
+        self.city = city
+        self.latitude = latitude
+        self.longitude = longitude
+        self.source = source
+        self.clean = clean
+        self._hours: List[int] = []
+        self._pm25: List[float] = []
+        self._pm10: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self._hours)
+
+    def append(self, ts: Union[datetime, str, None], pm25: Any, pm10: Any):
+        if not isinstance(ts, datetime):
+            ts = parse_ts(ts)
+            if ts is None:
+                return
+        self.append_hour(to_epoch_hour(ts), pm25, pm10)
+
+    def append_hour(self, hour: int, pm25: Any, pm10: Any):
+        """Append an observation already keyed by epoch hour."""
+        if self.clean:
+            pm25, pm10 = clean_pollutant(pm25), clean_pollutant(pm10)
+        self._hours.append(hour)
+        self._pm25.append(np.nan if pm25 is None else pm25)
+        self._pm10.append(np.nan if pm10 is None else pm10)
+
+    def build(self) -> HourlyFrame:
+        return HourlyFrame(self._hours, self._pm25, self._pm10,
+                           self.city, self.latitude, self.longitude, self.source)
+
+
+def as_frame(rows: Union[HourlyFrame, Sequence[Dict[str, Any]], None]) -> Optional[HourlyFrame]:
+    """Accept either a frame or legacy row dicts; returns None for empty input."""
+    if rows is None:
+        return None
+    if isinstance(rows, HourlyFrame):
+        return rows if len(rows) else None
+    if not rows:
+        return None
+    return HourlyFrame.from_rows(rows)
@@ -1,11 +1,12 @@
 import logging
 from datetime import datetime, date
-from typing import List, Dict, Any, Optional
+from typing import Optional
 
-import requests
 from bs4 import BeautifulSoup  # type: ignore
 
-from .normalize import make_row, parse_ts
+from ..breaker import CircuitOpenError, get_breaker, guarded_get
+from .frame import FrameBuilder, HourlyFrame
+from .normalize import parse_ts
 
 
 logger = logging.getLogger(__name__)
@@ -14,18 +15,20 @@ HEADERS = {
     "User-Agent": "Mozilla/5.0 (compatible; AirQualityBot/1.0; +https://example.com/contact)",
 }
 TIMEOUT = 15
-RETRIES = 2
+
+_breaker = get_breaker("iqair", TIMEOUT)
 
 
 def _get(url: str) -> Optional[str]:
-    for i in range(RETRIES + 1):
-        try:
-            r = requests.get(url, headers=HEADERS, timeout=TIMEOUT)
-            if r.status_code == 200:
-                return r.text
-            logger.warning("IQAir non-200: %s", r.status_code)
-        except Exception as e:
-            logger.warning("IQAir request failed (try %s): %s", i + 1, e)
+    try:
+        r = guarded_get(_breaker, url, headers=HEADERS)
+        if r.status_code == 200:
+            return r.text
+        logger.warning("IQAir non-200: %s", r.status_code)
+    except CircuitOpenError:
+        logger.debug("IQAir skipped, circuit open")
+    except Exception as e:
+        logger.warning("IQAir request failed: %s", e)
     return None
 
 
@@ -35,13 +38,13 @@ def _guess_city_path(city: str) -> str:
     return f"https://www.iqair.com/{slug}"
 
 
-def fetch_iqair(city: str, start: date, end: date, lat: float = None, lon: float = None) -> List[Dict[str, Any]]:
-    rows: List[Dict[str, Any]] = []
+def fetch_iqair(city: str, start: date, end: date, lat: float = None, lon: float = None) -> HourlyFrame:
+    builder = FrameBuilder(city, lat, lon, "iqair")
     try:
         url = _guess_city_path(city)
         html = _get(url)
         if not html:
-            return rows
+            return builder.build()
         soup = BeautifulSoup(html, "html.parser")
 
         # Try to locate hourly/historical blocks; site structure may change
@@ -97,10 +100,10 @@ def fetch_iqair(city: str, start: date, end: date, lat: float = None, lon: float
 
         for ts_text, pm25, pm10 in candidates:
             ts = parse_ts(ts_text) or datetime.utcnow()
-            rows.append(make_row(ts=ts, city=city, latitude=lat, longitude=lon, pm25=pm25, pm10=pm10, source="iqair"))
+            builder.append(ts, pm25, pm10)
     except Exception as e:
         logger.warning("fetch_iqair failed: %s", e)
-    return rows
+    return builder.build()
 
 
 
@@ -1,7 +1,8 @@
 import logging
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any
+from typing import Optional, Any, Sequence, Tuple
 
+import numpy as np
 from dateutil import parser as dtparser
 
 
@@ -15,18 +16,102 @@ def align_to_hour(ts: datetime) -> datetime:
     return ts.replace(minute=0, second=0, microsecond=0, tzinfo=timezone.utc)
 
 
+# Epoch values above this are taken as milliseconds (1e11 s is year 5138)
+_EPOCH_MS_THRESHOLD = 1e11
+_UTC_SUFFIXES = ("Z", "z", "+00:00", "+0000")
+
+
+def _from_epoch(value: float) -> datetime:
+    if abs(value) >= _EPOCH_MS_THRESHOLD:
+        value = value / 1000.0
+    return datetime.fromtimestamp(value, tz=timezone.utc)
+
+
+def _parse_fast(s: str) -> Optional[datetime]:
+    """
+    Fast paths for the formats upstreams actually send: ISO-8601 with Z/offset,
+    'YYYY-MM-DD HH:MM:SS' and epoch seconds/milliseconds. None means "not handled here".
+    """
+    if len(s) >= 10 and s[4] == "-" and s[7] == "-":
+        if s[-1] in "Zz":
+            # fromisoformat only learned 'Z' in 3.11
+            s = s[:-1] + "+00:00"
+        try:
+            return datetime.fromisoformat(s)
+        except ValueError:
+            return None
+    # Epoch; shorter digit runs are more likely compact dates like 20240101
+    if len(s) >= 9 and s.replace(".", "", 1).isdigit():
+        return _from_epoch(float(s))
+    return None
+
+
 def parse_ts(value: Any) -> Optional[datetime]:
     if value is None:
         return None
     try:
         if isinstance(value, datetime):
             return value
-        return dtparser.parse(str(value))
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return _from_epoch(float(value))
+        s = str(value).strip()
+        ts = _parse_fast(s)
+        if ts is not None:
+            return ts
+        # Last resort: anything dateutil understands (scraped free text, odd layouts)
+        return dtparser.parse(s)
     except Exception:
         logger.debug("Failed to parse timestamp: %r", value)
         return None
 
 
+def parse_ts_hours(values: Sequence[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized parse to epoch hours (UTC, floored), for whole pages of timestamps.
+    Naive/UTC ISO strings and epoch digit strings are converted by NumPy in bulk;
+    anything else (other offsets, free text, non-strings) goes through parse_ts.
+    Returns (hours int64, ok mask); hours are 0 where parsing failed.
+    """
+    n = len(values)
+    hours = np.zeros(n, dtype=np.int64)
+    ok = np.zeros(n, dtype=bool)
+    if n == 0:
+        return hours, ok
+    is_str = np.fromiter((isinstance(v, str) for v in values), dtype=bool, count=n)
+    s = np.array([v if isinstance(v, str) else "" for v in values], dtype=str)
+    s = np.char.strip(s)
+
+    # ISO dates: drop a UTC designator; anything still carrying an offset is left for parse_ts
+    iso = is_str & (np.char.str_len(s) >= 10) & (np.char.find(s, "-") == 4)
+    for suffix in _UTC_SUFFIXES:
+        m = iso & np.char.endswith(s, suffix)
+        if m.any():
+            # a UTC suffix can only appear once, at the end, so replace() is a safe strip
+            s[m] = np.char.replace(s[m], suffix, "")
+    iso &= (np.char.find(s, "+", 10) < 0) & (np.char.find(s, "-", 10) < 0)
+    if iso.any():
+        try:
+            hours[iso] = s[iso].astype("datetime64[s]").astype("datetime64[h]").astype(np.int64)
+            ok[iso] = True
+        except ValueError:
+            pass
+
+    # Epoch seconds / milliseconds
+    epoch = is_str & ~ok & (np.char.str_len(s) >= 9) & np.char.isdigit(s)
+    if epoch.any():
+        secs = s[epoch].astype(np.float64)
+        secs = np.where(secs >= _EPOCH_MS_THRESHOLD, secs / 1000.0, secs)
+        hours[epoch] = np.floor(secs / 3600).astype(np.int64)
+        ok[epoch] = True
+
+    for i in np.flatnonzero(~ok).tolist():
+        ts = parse_ts(values[i])
+        if ts is not None:
+            hours[i] = int(align_to_hour(ts).timestamp()) // 3600
+            ok[i] = True
+    return hours, ok
+
+
 def safe_float(value: Any) -> Optional[float]:
     try:
         if value is None:
@@ -44,19 +129,3 @@ def clean_pollutant(value: Any) -> Optional[float]:
     if f < 0 or f > 1000:
         return None
     return f
-
-
-def make_row(ts: datetime, city: str, latitude: Optional[float], longitude: Optional[float],
-             pm25: Optional[float], pm10: Optional[float], source: str) -> Dict[str, Any]:
-    return {
-        "ts": align_to_hour(ts).strftime("%Y-%m-%d %H:00:00"),
-        "city": city,
-        "latitude": safe_float(latitude),
-        "longitude": safe_float(longitude),
-        "pm25": clean_pollutant(pm25),
-        "pm10": clean_pollutant(pm10),
-        "source": source,
-    }
-
-
-
@@ -1,113 +1,190 @@
 import logging
+import math
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime, date, timedelta
-from typing import List, Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
-import requests
-
-from .normalize import make_row, parse_ts
+from ...core.config import settings
+from ..breaker import CircuitOpenError, get_breaker, guarded_get
+from ..upstream_cache import contiguous_ranges, get_cache, iter_days, location_key
+from .frame import FrameBuilder, HourlyFrame
+from .normalize import parse_ts_hours
 
 
 logger = logging.getLogger(__name__)
 
 BASE_URL = "https://api.openaq.org/v2"
 TIMEOUT = 15  # seconds
-RETRIES = 2
+PAGE_SIZE = settings.OPENAQ_PAGE_SIZE
+MAX_WORKERS = settings.OPENAQ_MAX_WORKERS
+MAX_PAGES = settings.OPENAQ_MAX_PAGES  # per parameter
+_EPOCH_DAY = date(1970, 1, 1)
+
+_breaker = get_breaker("openaq", TIMEOUT)
 
 
 def _req(url: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    for i in range(RETRIES + 1):
-        try:
-            r = requests.get(url, params=params, timeout=TIMEOUT)
-            if r.status_code == 200:
-                return r.json()
-            logger.warning("OpenAQ non-200: %s %s", r.status_code, r.text[:200])
-        except Exception as e:
-            logger.warning("OpenAQ request failed (try %s): %s", i + 1, e)
+    try:
+        r = guarded_get(_breaker, url, params=params)
+        if r.status_code == 200:
+            return r.json()
+        logger.warning("OpenAQ non-200: %s %s", r.status_code, r.text[:200])
+    except CircuitOpenError:
+        logger.debug("OpenAQ skipped, circuit open")
+    except Exception as e:
+        logger.warning("OpenAQ request failed: %s", e)
     return None
 
 
-def fetch_openaq(city: str, start: date, end: date, lat: float = None, lon: float = None) -> List[Dict[str, Any]]:
-    rows: List[Dict[str, Any]] = []
-    try:
-        # OpenAQ measurements endpoint: we will fetch PM2.5 and PM10 separately and then merge by timestamp
-        start_dt = datetime.combine(start, datetime.min.time())
-        end_dt = datetime.combine(end + timedelta(days=1), datetime.min.time())  # inclusive end day
-
-        params_base = {
-            "limit": 100,
-            "page": 1,
-            "offset": 0,
-            "parameter": "pm25",
-            "date_from": start_dt.isoformat() + "Z",
-            "date_to": end_dt.isoformat() + "Z",
-            "order_by": "datetime",
-            "sort": "asc",
+def _page_count(meta: Optional[Dict[str, Any]], limit: int) -> Optional[int]:
+    """Total pages from the first page's meta.found; None when OpenAQ only gives a bound like '>1000'."""
+    found = (meta or {}).get("found")
+    if isinstance(found, int):
+        return max(1, math.ceil(found / limit))
+    return None
+
+
+class _HourIndex:
+    """
+    Hourly index filled as pages arrive, in any order.
+    Results are sorted by datetime ascending, so a measurement's position in the
+    overall result list orders it in time; per hour the latest measurement wins.
+    """
+
+    def __init__(self):
+        self.by_ts: Dict[int, Dict[str, Tuple[int, float]]] = {}
+        self.coords: Optional[Tuple[int, Any, Any]] = None
+        # False once any page request failed or OPENAQ_MAX_PAGES cut the result
+        # short, so a partial result is never cached
+        self.complete = True
+
+    def add_page(self, items: List[Dict[str, Any]], key: str, offset: int):
+        # Parse the whole page's timestamps in one vectorized pass; 'local' is only a fallback
+        hours, ok = parse_ts_hours([it.get("date", {}).get("utc") or it.get("date", {}).get("local") for it in items])
+        for i, (it, k, good) in enumerate(zip(items, hours.tolist(), ok.tolist())):
+            if not good:
+                continue
+            try:
+                val = float(it.get("value"))
+            except Exception:
+                continue
+            pos = offset + i
+            ent = self.by_ts.setdefault(k, {})
+            if key not in ent or ent[key][0] < pos:
+                ent[key] = (pos, val)
+            # Station coordinates are per-source metadata; keep the earliest one
+            c = it.get("coordinates", {})
+            if c.get("latitude") is not None and c.get("longitude") is not None:
+                if self.coords is None or pos < self.coords[0]:
+                    self.coords = (pos, c["latitude"], c["longitude"])
+
+
+def _fetch_index(city: str, start: date, end: date, lat: Optional[float], lon: Optional[float]) -> _HourIndex:
+    # OpenAQ measurements endpoint: PM2.5 and PM10 are fetched separately and merged by timestamp
+    start_dt = datetime.combine(start, datetime.min.time())
+    end_dt = datetime.combine(end + timedelta(days=1), datetime.min.time())  # inclusive end day
+
+    params_base = {
+        "limit": PAGE_SIZE,
+        "page": 1,
+        "offset": 0,
+        "parameter": "pm25",
+        "date_from": start_dt.isoformat() + "Z",
+        "date_to": end_dt.isoformat() + "Z",
+        "order_by": "datetime",
+        "sort": "asc",
+    }
+    if city:
+        params_base["city"] = city
+    if lat is not None and lon is not None:
+        params_base["coordinates"] = f"{lat},{lon}"
+        params_base["radius"] = 20000
+
+    def page_params(param: str, page: int) -> Dict[str, Any]:
+        params = dict(params_base)
+        params["parameter"] = param
+        params["page"] = page
+        return params
+
+    index = _HourIndex()
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="openaq") as pool:
+        # Both parameters start at once; once a first page reveals the total,
+        # the remaining pages fan out in parallel. Without a total we walk on page by page.
+        pending = {
+            pool.submit(_req, f"{BASE_URL}/measurements", page_params(param, 1)): (param, 1)
+            for param in ("pm25", "pm10")
         }
-        if city:
-            params_base["city"] = city
-        if lat is not None and lon is not None:
-            params_base["coordinates"] = f"{lat},{lon}"
-            params_base["radius"] = 20000
-
-        def fetch_param(param: str) -> List[Dict[str, Any]]:
-            merged: List[Dict[str, Any]] = []
-            params = dict(params_base)
-            params["parameter"] = param
-            page = 1
-            while True:
-                params["page"] = page
-                data = _req(f"{BASE_URL}/measurements", params)
-                if not data or "results" not in data:
-                    break
-                res = data["results"]
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                param, page = pending.pop(fut)
+                data = fut.result()
+                if data is None:
+                    index.complete = False
+                    continue
+                res = data.get("results")
                 if not res:
-                    break
-                merged.extend(res)
-                if len(res) < params["limit"]:
-                    break
-                page += 1
-            return merged
-
-        pm25_res = fetch_param("pm25")
-        pm10_res = fetch_param("pm10")
-
-        # Index by hour timestamp
-        by_ts: Dict[str, Dict[str, Any]] = {}
-
-        def add_values(items, key):
-            for it in items:
-                ts = parse_ts(it.get("date", {}).get("utc")) or parse_ts(it.get("date", {}).get("local"))
-                if not ts:
                     continue
-                ts_hr = ts.replace(minute=0, second=0, microsecond=0)
-                k = ts_hr.strftime("%Y-%m-%d %H:00:00")
-                ent = by_ts.setdefault(k, {"lat": it.get("coordinates", {}).get("latitude"),
-                                           "lon": it.get("coordinates", {}).get("longitude")})
-                val = it.get("value")
-                try:
-                    ent[key] = float(val)
-                except Exception:
-                    pass
-
-        add_values(pm25_res, "pm25")
-        add_values(pm10_res, "pm10")
-
-        for k, ent in by_ts.items():
-            ts_dt = parse_ts(k) or datetime.utcnow()
-            rows.append(
-                make_row(
-                    ts=ts_dt,
-                    city=city,
-                    latitude=ent.get("lat"),
-                    longitude=ent.get("lon"),
-                    pm25=ent.get("pm25"),
-                    pm10=ent.get("pm10"),
-                    source="openaq",
-                )
-            )
+                index.add_page(res, param, (page - 1) * PAGE_SIZE)
+
+                next_pages: List[int] = []
+                total = _page_count(data.get("meta"), PAGE_SIZE) if page == 1 else None
+                if total is not None:
+                    next_pages = list(range(2, min(total, MAX_PAGES) + 1))
+                    more = total > MAX_PAGES
+                else:
+                    more = len(res) >= PAGE_SIZE and (page == 1 or _page_count(data.get("meta"), PAGE_SIZE) is None)
+                    if more and page < MAX_PAGES:
+                        next_pages = [page + 1]
+                        more = False
+                if more:
+                    # Results are ascending, so the cap drops the newest hours
+                    logger.warning("OpenAQ %s %s..%s: more than OPENAQ_MAX_PAGES=%s pages of %s, newest data truncated",
+                                   city, start, end, MAX_PAGES, param)
+                    index.complete = False
+                for p in next_pages:
+                    pending[pool.submit(_req, f"{BASE_URL}/measurements", page_params(param, p))] = (param, p)
+    return index
+
+
+def _hour_day(hour: int) -> date:
+    return _EPOCH_DAY + timedelta(days=hour // 24)
+
+
+def fetch_openaq(city: str, start: date, end: date, lat: float = None, lon: float = None) -> HourlyFrame:
+    builder = FrameBuilder(city, lat, lon, "openaq")
+    try:
+        # Per-day entries: {"coords": [lat, lon] | None, "hours": [[hour, pm25, pm10], ...]}
+        cache = get_cache() if lat is not None and lon is not None else None
+        days = list(iter_days(start, end))
+        by_day: Dict[date, Optional[Dict[str, Any]]] = {
+            day: (cache.get(location_key("openaq", lat, lon, day, city)) if cache else None) for day in days
+        }
+
+        for lo, hi in contiguous_ranges([day for day in days if by_day[day] is None]):
+            index = _fetch_index(city, lo, hi, lat, lon)
+            coords = [index.coords[1], index.coords[2]] if index.coords else None
+            fresh: Dict[date, Dict[str, Any]] = {day: {"coords": coords, "hours": []} for day in iter_days(lo, hi)}
+            for k in sorted(index.by_ts):
+                ent = index.by_ts[k]
+                day_entry = fresh.get(_hour_day(k))
+                if day_entry is not None:
+                    day_entry["hours"].append([k, ent["pm25"][1] if "pm25" in ent else None,
+                                               ent["pm10"][1] if "pm10" in ent else None])
+            for day, entry in fresh.items():
+                by_day[day] = entry
+                if cache and index.complete:
+                    cache.put(location_key("openaq", lat, lon, day, city), entry, cache.ttl_for_day(day))
+
+        # Station coordinates are per-source metadata; keep the earliest one
+        for day in days:
+            coords = by_day[day] and by_day[day].get("coords")
+            if coords:
+                builder.latitude, builder.longitude = coords
+                break
+        for day in days:
+            for k, pm25, pm10 in (by_day[day] or {}).get("hours", []):
+                builder.append_hour(k, pm25, pm10)
     except Exception as e:
         logger.warning("fetch_openaq failed: %s", e)
-    return rows
-
-
-
+    return builder.build()
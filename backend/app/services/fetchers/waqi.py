@@ -1,35 +1,39 @@
 import logging
 from datetime import datetime, date
-from typing import List, Dict, Any, Optional
+from typing import Dict, Any, Optional
 
 import requests
 from bs4 import BeautifulSoup  # type: ignore
 
-from .normalize import make_row, parse_ts
+from ..breaker import CircuitOpenError, get_breaker, guarded_get
+from .frame import FrameBuilder, HourlyFrame
+from .normalize import parse_ts
 
 
 logger = logging.getLogger(__name__)
 
 TIMEOUT = 15
-RETRIES = 2
+
+_breaker = get_breaker("waqi", TIMEOUT)
 
 
 def _get(url: str, params: Dict[str, Any] = None, headers: Dict[str, Any] = None) -> Optional[requests.Response]:
     params = params or {}
     headers = headers or {"User-Agent": "Mozilla/5.0 (compatible; AirQualityBot/1.0)"}
-    for i in range(RETRIES + 1):
-        try:
-            r = requests.get(url, params=params, headers=headers, timeout=TIMEOUT)
-            if r.status_code == 200:
-                return r
-            logger.warning("WAQI non-200: %s", r.status_code)
-        except Exception as e:
-            logger.warning("WAQI request failed (try %s): %s", i + 1, e)
+    try:
+        r = guarded_get(_breaker, url, params=params, headers=headers)
+        if r.status_code == 200:
+            return r
+        logger.warning("WAQI non-200: %s", r.status_code)
+    except CircuitOpenError:
+        logger.debug("WAQI skipped, circuit open")
+    except Exception as e:
+        logger.warning("WAQI request failed: %s", e)
     return None
 
 
-def fetch_waqi(city: str, start: date, end: date, lat: float = None, lon: float = None, token: Optional[str] = None) -> List[Dict[str, Any]]:
-    rows: List[Dict[str, Any]] = []
+def fetch_waqi(city: str, start: date, end: date, lat: float = None, lon: float = None, token: Optional[str] = None) -> HourlyFrame:
+    builder = FrameBuilder(city, lat, lon, "waqi")
     try:
         if token:
             # API mode
@@ -43,8 +47,8 @@ def fetch_waqi(city: str, start: date, end: date, lat: float = None, lon: float
                     ts = parse_ts(time_obj.get("utc") or time_obj.get("s")) or datetime.utcnow()
                     pm25 = iaqi.get("pm25", {}).get("v")
                     pm10 = iaqi.get("pm10", {}).get("v")
-                    rows.append(make_row(ts=ts, city=city, latitude=lat, longitude=lon, pm25=pm25, pm10=pm10, source="waqi"))
-                    return rows
+                    builder.append(ts, pm25, pm10)
+                    return builder.build()
                 except Exception:
                     logger.warning("WAQI API parse failed")
 
@@ -54,7 +58,7 @@ def fetch_waqi(city: str, start: date, end: date, lat: float = None, lon: float
         url = f"https://aqicn.org/city/{slug}/"
         res = _get(url)
         if res is None:
-            return rows
+            return builder.build()
         html = res.text
         soup = BeautifulSoup(html, "html.parser")
 
@@ -85,10 +89,10 @@ def fetch_waqi(city: str, start: date, end: date, lat: float = None, lon: float
         except Exception:
             pass
 
-        rows.append(make_row(ts=ts, city=city, latitude=lat, longitude=lon, pm25=pm25, pm10=pm10, source="waqi"))
+        builder.append(ts, pm25, pm10)
     except Exception as e:
         logger.warning("fetch_waqi failed: %s", e)
-    return rows
+    return builder.build()
 
 
 
@@ -9,6 +9,8 @@ from statsmodels.tsa.statespace.sarimax import SARIMAX
 from sklearn.metrics import mean_absolute_error, mean_squared_error
 from joblib import dump, load
 
+from .canonical import resolve_city
+
 MODELS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "models")
 os.makedirs(MODELS_DIR, exist_ok=True)
 
@@ -22,7 +24,7 @@ def _load_series(db: Session, city: str, days: int) -> pd.DataFrame:
                              AND source = 'aggregated'
                              AND ts >= DATE_SUB(NOW(), INTERVAL :days DAY)
                            ORDER BY ts
-                           """), {"city": city, "days": days}).mappings().all()
+                           """), {"city": resolve_city(db, city, create=False).name, "days": days}).mappings().all()
 
     if not rows:
         raise ValueError(f"No data found for {city} in last {days} days. Run /scrape first.")
@@ -37,9 +39,9 @@ def _load_series(db: Session, city: str, days: int) -> pd.DataFrame:
 
     return df  # columns: pm25 (float), index: hourly ts
 
-def _model_path(city: str) -> str:
-    safe = city.lower().replace(" ", "_")
-    return os.path.join(MODELS_DIR, f"{safe}_sarimax.joblib")
+def _model_path(city_id: str) -> str:
+    # Keyed by canonical city id so every spelling of a city shares one model
+    return os.path.join(MODELS_DIR, f"{city_id}_sarimax.joblib")
 
 def train_sarimax(df: pd.DataFrame) -> SARIMAX:
     """
@@ -63,13 +65,13 @@ def fit_and_save_model(db: Session, city: str, train_days: int = 30) -> str:
     df = _load_series(db, city, days=train_days)
     model = train_sarimax(df)
     result = model.fit(disp=False)
-    path = _model_path(city)
+    path = _model_path(resolve_city(db, city, create=False).id)
     dump(result, path)
     return path
 
 def forecast_city(db: Session, city: str, horizon_days: int = 7, train_days: int = 30, use_cache: bool = True):
     """Fit (or load) a SARIMAX model and forecast H days ahead with CIs."""
-    path = _model_path(city)
+    path = _model_path(resolve_city(db, city, create=False).id)
     result = None
 
     if use_cache and os.path.exists(path):
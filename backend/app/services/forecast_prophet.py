@@ -9,6 +9,8 @@ from sqlalchemy.orm import Session
 from prophet import Prophet
 from sklearn.metrics import mean_absolute_error, mean_squared_error
 from joblib import dump, load
+
+from .canonical import resolve_city
 import logging
 
 logger = logging.getLogger(__name__)
@@ -26,7 +28,7 @@ def _load_series(db: Session, city: str, days: int) -> pd.DataFrame:
                              AND source = 'aggregated'
                              AND ts >= DATE_SUB(NOW(), INTERVAL :days DAY)
                            ORDER BY ts
-                           """), {"city": city, "days": days}).mappings().all()
+                           """), {"city": resolve_city(db, city, create=False).name, "days": days}).mappings().all()
 
     if not rows:
         raise ValueError(f"No data found for {city} in last {days} days. Run /scrape first.")
@@ -42,10 +44,9 @@ def _load_series(db: Session, city: str, days: int) -> pd.DataFrame:
 
     return df  # columns: pm25 (float), index: hourly ts
 
-def _model_path(city: str) -> str:
-    """Generate safe filesystem path for model storage."""
-    safe = city.lower().replace(" ", "_")
-    return os.path.join(MODELS_DIR, f"{safe}_prophet.joblib")
+def _model_path(city_id: str) -> str:
+    """Generate filesystem path for model storage, keyed by canonical city id."""
+    return os.path.join(MODELS_DIR, f"{city_id}_prophet.joblib")
 
 def train_prophet(df: pd.DataFrame) -> Prophet:
     """
@@ -115,7 +116,7 @@ def fit_and_save_model(db: Session, city: str, train_days: int = 30) -> str:
     model.fit(prophet_df)
 
     # Save fitted model
-    path = _model_path(city)
+    path = _model_path(resolve_city(db, city, create=False).id)
     dump(model, path)
     logger.info(f"Prophet model saved for {city} at {path}")
 
@@ -141,7 +142,7 @@ def forecast_city(
     Returns:
         Dict with city, horizon_hours, and forecast series
     """
-    path = _model_path(city)
+    path = _model_path(resolve_city(db, city, create=False).id)
     model = None
 
     # Try to load cached model
@@ -0,0 +1,207 @@
+import csv
+import heapq
+import logging
+import os
+import re
+import sys
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_KEY_END = "\U0010ffff"  # sorts after every normalized key continuing a prefix
+
+# Prefixes of any length whose key range exceeds _RANK_ALL keep their _TOP_K
+# most populous places precomputed (the /cities/search limit is capped at
+# _TOP_K); any other range is small enough to rank in full
+_TOP_K = 50
+_RANK_ALL = 2000
+
+
+def normalize_name(name: str) -> str:
+    """Accent-, case- and punctuation-insensitive form: 'São Paulo' -> 'sao paulo'."""
+    decomposed = unicodedata.normalize("NFKD", name)
+    ascii_only = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(" ", ascii_only.lower()).strip()
+
+
+class Gazetteer:
+    """
+    Offline city index built from a GeoNames cities dump (cities500/1000/5000/15000.txt).
+
+    Entries are stored column-wise (names, country codes, coordinates, population).
+    Two indexes sit on top:
+      - `_exact`: normalized name -> entry, the most populous place winning ties
+      - `_keys` / `_ids`: every normalized name and alternate name, sorted, so a
+        prefix maps to one contiguous range found by bisect
+      - `_top`: the most populous places for every prefix whose range is too
+        large to rank per keystroke
+    """
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.countries: List[str] = []
+        self.latitudes = array("d")
+        self.longitudes = array("d")
+        self.populations = array("q")
+        self._exact: Dict[str, int] = {}
+        self._keys: List[str] = []
+        self._ids = array("i")
+        self._top: Dict[str, array] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def from_geonames(cls, path: str, with_alternates: bool = True) -> "Gazetteer":
+        gaz = cls()
+        pairs: List[Tuple[str, int]] = []
+        csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+        with open(path, encoding="utf-8", newline="") as fh:
+            for row in csv.reader(fh, delimiter="\t", quoting=csv.QUOTE_NONE):
+                if len(row) < 15:
+                    continue
+                try:
+                    lat, lon = float(row[4]), float(row[5])
+                    population = int(row[14] or 0)
+                except ValueError:
+                    continue
+                idx = len(gaz.names)
+                gaz.names.append(row[1])
+                gaz.countries.append(row[8])
+                gaz.latitudes.append(lat)
+                gaz.longitudes.append(lon)
+                gaz.populations.append(population)
+
+                keys = {normalize_name(row[1]), normalize_name(row[2])}
+                for key in keys:
+                    best = gaz._exact.get(key)
+                    if best is None or population > gaz.populations[best]:
+                        gaz._exact[key] = idx
+                if with_alternates and row[3]:
+                    keys.update(normalize_name(alt) for alt in row[3].split(","))
+                pairs.extend((key, idx) for key in keys if key)
+
+        pairs.sort()
+        gaz._keys = [key for key, _ in pairs]
+        gaz._ids = array("i", (idx for _, idx in pairs))
+        gaz._build_top()
+        return gaz
+
+    def _range(self, key: str, lo: int = 0) -> Tuple[int, int]:
+        return bisect_left(self._keys, key, lo), bisect_left(self._keys, key + _KEY_END, lo)
+
+    def _ranked(self, ids, limit: int) -> List[int]:
+        return heapq.nsmallest(limit, set(ids), key=lambda i: (-self.populations[i], self.names[i]))
+
+    def _build_top(self):
+        # Only the children of a large range can be large themselves, so the walk
+        # descends just those; each level costs at most one pass over the keys
+        stack = [(0, 0, len(self._keys))]  # (prefix length, range) of a large prefix
+        while stack:
+            length, lo, hi = stack.pop()
+            i = lo
+            while i < hi:
+                prefix = self._keys[i][:length + 1]
+                if len(prefix) <= length:  # the parent prefix itself
+                    i += 1
+                    continue
+                a, b = self._range(prefix, i)
+                if b - a > _RANK_ALL:
+                    self._top[prefix] = array("i", self._ranked(self._ids[a:b], _TOP_K))
+                    stack.append((length + 1, a, b))
+                i = b
+
+    def _entry(self, idx: int) -> Dict[str, object]:
+        return {
+            "name": self.names[idx],
+            "country": self.countries[idx],
+            "latitude": self.latitudes[idx],
+            "longitude": self.longitudes[idx],
+            "population": self.populations[idx],
+        }
+
+    def find(self, city: str) -> Optional[Dict[str, object]]:
+        """Best place for an exact (normalized) name; 'Paris, FR' restricts to a country."""
+        name, _, country = city.partition(",")
+        country = country.strip().upper()
+        key = normalize_name(name)
+        if not key:
+            return None
+        if len(country) == 2:
+            hits = self._prefix_ids(key, limit=None, exact=True)
+            hits = [i for i in hits if self.countries[i] == country]
+            if not hits:
+                return None
+            idx = max(hits, key=lambda i: self.populations[i])
+        else:
+            idx = self._exact.get(key)
+            if idx is None:
+                return None
+        return self._entry(idx)
+
+    def lookup(self, city: str) -> Optional[Tuple[float, float]]:
+        entry = self.find(city)
+        return (entry["latitude"], entry["longitude"]) if entry is not None else None
+
+    def _prefix_ids(self, key: str, limit: Optional[int], exact: bool = False) -> List[int]:
+        seen: Dict[int, None] = {}
+        i = bisect_left(self._keys, key)
+        while i < len(self._keys):
+            k = self._keys[i]
+            if (k != key) if exact else not k.startswith(key):
+                break
+            seen[self._ids[i]] = None
+            i += 1
+            if limit is not None and len(seen) >= limit:
+                break
+        return list(seen)
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, object]]:
+        """
+        Autocomplete: places whose name or alternate name starts with `query`,
+        most populous first.
+        """
+        key = normalize_name(query)
+        if not key:
+            return []
+        lo, hi = self._range(key)
+        top = self._top.get(key)
+        if top is not None and limit <= len(top):
+            ids = list(top[:limit])
+        else:
+            ids = self._ranked(self._ids[lo:hi], limit)
+        return [self._entry(i) for i in ids]
+
+
+_gazetteer: Optional[Gazetteer] = None
+_loaded = False
+_load_lock = threading.Lock()
+
+
+def get_gazetteer() -> Optional[Gazetteer]:
+    """
+    Shared gazetteer loaded from GAZETTEER_PATH on first use, or None when the
+    variable is unset or the file cannot be read.
+    GAZETTEER_ALTERNATES=0 skips alternate names to save memory on large dumps.
+    """
+    global _gazetteer, _loaded
+    if _loaded:
+        return _gazetteer
+    with _load_lock:
+        if not _loaded:
+            path = os.getenv("GAZETTEER_PATH")
+            if path:
+                try:
+                    _gazetteer = Gazetteer.from_geonames(
+                        path, with_alternates=os.getenv("GAZETTEER_ALTERNATES", "1") not in ("0", "false", "False"))
+                    logger.info("Loaded gazetteer with %s places from %s", len(_gazetteer), path)
+                except OSError as e:
+                    logger.warning("Gazetteer unavailable: %s", e)
+            _loaded = True
+    return _gazetteer
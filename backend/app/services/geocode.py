@@ -1,19 +1,80 @@
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
 import requests
-from sqlalchemy import text
+from sqlalchemy import bindparam, text
 from sqlalchemy.orm import Session
 
-def get_coords_for_city(db: Session, city: str):
-    row = db.execute(
-        text("SELECT latitude, longitude FROM geocodes WHERE city=:c"),
-        {"c": city}
-    ).fetchone()
-    if row:
-        return float(row[0]), float(row[1])
+from ..core.config import settings
+from .gazetteer import get_gazetteer
+from .http_client import get_client
+
+# Process-level cache of the geocodes table, keyed by lower-cased city name
+# (the table's collation is case-insensitive, so lookups were too).
+# Unknown names are remembered for GEOCODE_NEGATIVE_TTL seconds (default 3600)
+# so repeated typos don't hit the geocoder every time.
+_coords: Dict[str, Tuple[float, float]] = {}
+_unknown: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def _key(city: str) -> str:
+    return city.strip().lower()
+
+
+def _cached(city: str) -> Optional[Tuple[float, float]]:
+    key = _key(city)
+    coords = _coords.get(key)
+    if coords is not None:
+        return coords
+    expires = _unknown.get(key)
+    if expires is not None:
+        if expires > time.time():
+            raise RuntimeError(f"GeocodingNoResult: City '{city}' not found")
+        with _lock:
+            _unknown.pop(key, None)
+    return None
+
+
+def _offline(city: str) -> Optional[Tuple[float, float]]:
+    gaz = get_gazetteer()
+    coords = gaz.lookup(city) if gaz is not None else None
+    if coords is not None:
+        _remember(city, *coords)
+    return coords
+
+
+def _remember(city: str, lat: float, lon: float):
+    with _lock:
+        _coords[_key(city)] = (lat, lon)
+        _unknown.pop(_key(city), None)
+
+
+def preload_geocodes(db: Session) -> int:
+    """Warm the cache with every stored geocode; called once at startup."""
+    rows = db.execute(text("SELECT city, latitude, longitude FROM geocodes")).fetchall()
+    with _lock:
+        for city, lat, lon in rows:
+            _coords[_key(city)] = (float(lat), float(lon))
+    return len(rows)
+
+
+# 'Paris, US': the geocoder takes the country as a filter, not as part of the name
+_COUNTRY_SUFFIX = re.compile(r"^(.*?)\s*,\s*([A-Za-z]{2})$")
+
 
+def _geocode_upstream(db: Session, city: str) -> Tuple[float, float]:
+    m = _COUNTRY_SUFFIX.match(city.strip())
+    name, country = (m.group(1), m.group(2).upper()) if m else (city, None)
+    params = {"name": name, "count": 1}
+    if country:
+        params["countryCode"] = country
     try:
-        r = requests.get(
+        r = get_client().get(
             "https://geocoding-api.open-meteo.com/v1/search",
-            params={"name": city, "count": 1},
+            params=params,
             timeout=20,
         )
         r.raise_for_status()
@@ -23,15 +84,70 @@ def get_coords_for_city(db: Session, city: str):
     except requests.RequestException as e:
         raise RuntimeError(f"GeocodingHTTP: {e}")
 
-    if not data.get("results"):
+    results = data.get("results")
+    if not results or (country and str(results[0].get("country_code", "")).upper() != country):
+        with _lock:
+            _unknown[_key(city)] = time.time() + settings.GEOCODE_NEGATIVE_TTL
         raise RuntimeError(f"GeocodingNoResult: City '{city}' not found")
 
-    lat = float(data["results"][0]["latitude"])
-    lon = float(data["results"][0]["longitude"])
+    lat = float(results[0]["latitude"])
+    lon = float(results[0]["longitude"])
 
+    store_coords(db, city, lat, lon)
+    db.commit()
+    return lat, lon
+
+
+def store_coords(db: Session, city: str, lat: float, lon: float):
+    """Persist and cache coordinates for a city name; does not commit."""
     db.execute(
         text("REPLACE INTO geocodes (city, latitude, longitude) VALUES (:c, :lat, :lon)"),
         {"c": city, "lat": lat, "lon": lon},
     )
-    db.commit()
-    return lat, lon
+    _remember(city, lat, lon)
+
+
+def get_coords_for_city(db: Session, city: str):
+    coords = _cached(city) or _offline(city)
+    if coords is not None:
+        return coords
+
+    row = db.execute(
+        text("SELECT latitude, longitude FROM geocodes WHERE city=:c"),
+        {"c": city}
+    ).fetchone()
+    if row:
+        _remember(city, float(row[0]), float(row[1]))
+        return float(row[0]), float(row[1])
+
+    return _geocode_upstream(db, city)
+
+
+def get_coords_for_cities(db: Session, cities: List[str]) -> Dict[str, Tuple[float, float]]:
+    """
+    Batch variant of get_coords_for_city: cache and gazetteer hits first, then one
+    IN query for the rest, then the upstream geocoder for whatever is still unknown.
+    Raises like get_coords_for_city for the first city that cannot be resolved.
+    """
+    out: Dict[str, Tuple[float, float]] = {}
+    misses: List[str] = []
+    for city in dict.fromkeys(cities):
+        coords = _cached(city) or _offline(city)
+        if coords is not None:
+            out[city] = coords
+        else:
+            misses.append(city)
+
+    if misses:
+        rows = db.execute(
+            text("SELECT city, latitude, longitude FROM geocodes WHERE city IN :cities")
+            .bindparams(bindparam("cities", expanding=True)),
+            {"cities": misses},
+        ).fetchall()
+        for city, lat, lon in rows:
+            _remember(city, float(lat), float(lon))
+        for city in misses:
+            coords = _coords.get(_key(city))
+            out[city] = coords if coords is not None else _geocode_upstream(db, city)
+
+    return {city: out[city] for city in dict.fromkeys(cities)}
@@ -0,0 +1,115 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HttpClient:
+    """
+    Process-wide pooled HTTP client shared by all upstream fetchers.
+
+    One HTTPAdapter (and so one urllib3 pool per host) is shared by every thread,
+    which keeps TLS connections alive between calls. Each thread gets its own
+    requests.Session on top of it so cookies and headers never leak across threads.
+
+    Config (env):
+      HTTP_POOL_HOSTS      number of per-host pools kept open (default 20)
+      HTTP_POOL_PER_HOST   max open connections per host; extra callers wait (default 10)
+      HTTP_CONNECT_TIMEOUT connect timeout in seconds (default 5)
+      HTTP_READ_TIMEOUT    default read timeout in seconds (default 20)
+      HTTP_RETRIES         retries on connection errors, timeouts, 429 and 5xx (default 2)
+      HTTP_BACKOFF         base backoff in seconds, doubled per retry (default 0.5)
+    """
+
+    def __init__(self):
+        self.connect_timeout = settings.HTTP_CONNECT_TIMEOUT
+        self.read_timeout = settings.HTTP_READ_TIMEOUT
+        self.retries = settings.HTTP_RETRIES
+        self.backoff = settings.HTTP_BACKOFF
+        self._adapter = HTTPAdapter(
+            pool_connections=settings.HTTP_POOL_HOSTS,
+            pool_maxsize=settings.HTTP_POOL_PER_HOST,
+            pool_block=True,
+            max_retries=0,
+        )
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("http://", self._adapter)
+            session.mount("https://", self._adapter)
+            self._local.session = session
+        return session
+
+    def _sleep_before_retry(self, attempt: int, resp: Optional[requests.Response] = None):
+        delay = self.backoff * (2 ** attempt)
+        if resp is not None:
+            try:
+                delay = max(delay, float(resp.headers.get("Retry-After", 0)))
+            except (TypeError, ValueError):
+                pass
+        if delay > 0:
+            time.sleep(delay)
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, Any]] = None,
+            timeout: Optional[float] = None, retries: Optional[int] = None) -> requests.Response:
+        """
+        GET through the shared pool. `timeout` overrides the read timeout and
+        `retries` the retry count for this call. Retryable statuses are retried and
+        the last response is returned; the last exception is raised once retries run out.
+        """
+        retries = self.retries if retries is None else max(0, retries)
+        read_timeout = self.read_timeout if timeout is None else timeout
+        connect_timeout = min(self.connect_timeout, read_timeout)
+        for attempt in range(retries + 1):
+            try:
+                resp = self._session().get(url, params=params, headers=headers,
+                                           timeout=(connect_timeout, read_timeout))
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= retries:
+                    raise
+                logger.debug("GET %s failed (try %s): %s", url, attempt + 1, e)
+                self._sleep_before_retry(attempt)
+                continue
+            if resp.status_code in RETRY_STATUSES and attempt < retries:
+                logger.debug("GET %s returned %s (try %s)", url, resp.status_code, attempt + 1)
+                self._sleep_before_retry(attempt, resp)
+                continue
+            return resp
+        raise RuntimeError("unreachable")
+
+    def close(self):
+        self._adapter.close()
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
+
+
+def close_client():
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
@@ -0,0 +1,106 @@
+import logging
+import threading
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from .fetchers.frame import HourlyFrame
+
+
+logger = logging.getLogger(__name__)
+
+# (city, source) -> raw_series.id; ids never change once assigned
+_series_ids: Dict[Tuple[str, str], int] = {}
+_series_lock = threading.Lock()
+
+
+def raw_store_enabled() -> bool:
+    return settings.RAW_STORE
+
+
+def _epoch_hour(day: date) -> int:
+    return int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp()) // 3600
+
+
+def _series_id(db: Session, frame: HourlyFrame) -> int:
+    key = (frame.city, frame.source)
+    sid = _series_ids.get(key)
+    if sid is not None:
+        return sid
+    db.execute(
+        text("""
+            INSERT INTO raw_series (city, source, latitude, longitude)
+            VALUES (:c, :s, :lat, :lon)
+            ON DUPLICATE KEY UPDATE latitude=VALUES(latitude), longitude=VALUES(longitude)
+        """),
+        {"c": frame.city, "s": frame.source, "lat": frame.latitude, "lon": frame.longitude},
+    )
+    sid = db.execute(text("SELECT id FROM raw_series WHERE city=:c AND source=:s"),
+                     {"c": frame.city, "s": frame.source}).scalar()
+    with _series_lock:
+        _series_ids[key] = int(sid)
+    return int(sid)
+
+
+def write_frames(db: Session, frames: Iterable[Optional[HourlyFrame]]) -> int:
+    """
+    Append per-source frames to measurements_raw in chunked multi-row INSERTs.
+    A re-fetched hour overwrites the stored value (upstreams revise recent hours).
+    Hours with neither pollutant are skipped. Commits; returns rows written.
+    """
+    size = settings.RAW_STORE_CHUNK_SIZE
+    written = 0
+    for frame in frames:
+        if frame is None or not len(frame):
+            continue
+        keep = ~(np.isnan(frame.pm25) & np.isnan(frame.pm10))
+        if not keep.any():
+            continue
+        sid = _series_id(db, frame)
+        hours = frame.hours[keep].tolist()
+        pm25 = [None if v != v else v for v in frame.pm25[keep].tolist()]
+        pm10 = [None if v != v else v for v in frame.pm10[keep].tolist()]
+        for i in range(0, len(hours), size):
+            params, groups = {"sid": sid}, []
+            for j in range(i, min(i + size, len(hours))):
+                groups.append(f"(:sid, :h{j}, :a{j}, :b{j})")
+                params[f"h{j}"], params[f"a{j}"], params[f"b{j}"] = hours[j], pm25[j], pm10[j]
+            db.execute(text(f"""
+                INSERT INTO measurements_raw (series_id, ts_hour, pm25, pm10)
+                VALUES {', '.join(groups)}
+                ON DUPLICATE KEY UPDATE pm25=VALUES(pm25), pm10=VALUES(pm10)
+            """), params)
+        written += len(hours)
+    db.commit()
+    return written
+
+
+def load_frames(db: Session, city: str, start: date, end: date,
+                sources: Optional[List[str]] = None) -> Dict[str, HourlyFrame]:
+    """Raw frames per source for city over the days [start, end], hours ascending."""
+    q = "SELECT id, source, latitude, longitude FROM raw_series WHERE city=:c"
+    params: dict = {"c": city}
+    if sources:
+        q += " AND source IN :sources"
+        params["sources"] = list(sources)
+    stmt = text(q).bindparams(bindparam("sources", expanding=True)) if sources else text(q)
+    series = db.execute(stmt, params).fetchall()
+
+    lo, hi = _epoch_hour(start), _epoch_hour(end) + 23
+    out: Dict[str, HourlyFrame] = {}
+    for sid, source, lat, lon in series:
+        rows = db.execute(text("""
+            SELECT ts_hour, pm25, pm10 FROM measurements_raw
+            WHERE series_id=:sid AND ts_hour BETWEEN :lo AND :hi
+            ORDER BY ts_hour
+        """), {"sid": sid, "lo": lo, "hi": hi}).fetchall()
+        if not rows:
+            continue
+        data = np.array([(r[0], np.nan if r[1] is None else r[1], np.nan if r[2] is None else r[2]) for r in rows],
+                        dtype=np.float64)
+        out[source] = HourlyFrame(data[:, 0].astype(np.int64), data[:, 1], data[:, 2], city, lat, lon, source)
+    return out
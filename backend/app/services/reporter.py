@@ -68,8 +68,11 @@ def _metrics_table(metrics: Dict[str, Any]) -> Optional[Table]:
 def _stats_table(stats: Dict[str, Any], report_type: Optional[str] = None) -> Optional[Table]:
     if not stats:
         return None
-    # Expect shape: { city: { mean_* or mean_yhat, min_*, max_*, n_points } }
+    # Expect shape: { city: { mean_* or mean_yhat, min_*, max_*, n_points, optional p95_*/p99_* } }
+    with_pct = any(isinstance(v, dict) and v.get("p95_pm25") is not None for v in stats.values())
     header = ["City", "Mean (µg/m³)", "Range (µg/m³)", "Samples"]
+    if with_pct:
+        header[3:3] = ["P95 (µg/m³)", "P99 (µg/m³)"]
     rows = [header]
     for city, vals in stats.items():
         mean_val = vals.get("mean_pm25")
@@ -83,12 +86,16 @@ def _stats_table(stats: Dict[str, Any], report_type: Optional[str] = None) -> Op
             min_str = f"{min_v:.2f}" if isinstance(min_v, (int, float)) else "-"
             max_str = f"{max_v:.2f}" if isinstance(max_v, (int, float)) else "-"
             rng = f"{min_str} – {max_str}"
-        rows.append([
+        row = [
             city,
             f"{mean_val:.2f}" if isinstance(mean_val, (int, float)) else "-",
             rng,
             str(n) if n is not None else "-",
-        ])
+        ]
+        if with_pct:
+            row[3:3] = [f"{vals[k]:.2f}" if isinstance(vals.get(k), (int, float)) else "-"
+                        for k in ("p95_pm25", "p99_pm25")]
+        rows.append(row)
     t = Table(rows, hAlign='LEFT')
     t.setStyle(TableStyle([
         ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#111827")),
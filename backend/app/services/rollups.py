@@ -0,0 +1,261 @@
+import logging
+import math
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Set, Tuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+from .sketch import QuantileSketch
+
+
+logger = logging.getLogger(__name__)
+
+_STAT_COLUMNS = (
+    "n_hours", "n_pm25", "sum_pm25", "sumsq_pm25", "min_pm25", "max_pm25",
+    "n_pm10", "sum_pm10", "sumsq_pm10", "min_pm10", "max_pm10",
+)
+
+_DAILY_SELECT = """
+    SELECT city, source, DATE(ts) AS day,
+           COUNT(*), COUNT(pm25), SUM(pm25), SUM(pm25 * pm25), MIN(pm25), MAX(pm25),
+           COUNT(pm10), SUM(pm10), SUM(pm10 * pm10), MIN(pm10), MAX(pm10)
+    FROM measurements {partition}
+    WHERE ts >= :lo AND ts < :hi {extra}
+    GROUP BY city, source, DATE(ts)
+"""
+
+_HOURLY_VALUES = """
+    SELECT city, source, DATE(ts), pm25, pm10
+    FROM measurements {partition}
+    WHERE ts >= :lo AND ts < :hi {extra}
+    ORDER BY city, source, ts
+"""
+
+_SKETCH_BATCH = 1000
+_SPANS_PER_QUERY = 200
+
+PERCENTILES = (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+
+
+def rollup_hours(db: Session, lo: datetime, hi: datetime, partition: str | None = None,
+                 where: str = "", params: dict | None = None) -> int:
+    """
+    (Re)compute measurements_daily for every (city, source, day) with hourly rows
+    in [lo, hi), including the quantile sketches. Whole days should be covered:
+    a day's rollup is replaced, not merged, so a partial day would overwrite the
+    full-day totals.
+    `partition` restricts the scan to one partition; `where` adds conditions.
+    Does not commit. Returns the affected row count reported by MySQL.
+    """
+    fmt = {
+        "partition": f"PARTITION ({partition})" if partition else "",
+        "extra": f"AND {where}" if where else "",
+    }
+    bind = {"lo": lo, "hi": hi, **(params or {})}
+    updates = ", ".join(f"{c}=VALUES({c})" for c in _STAT_COLUMNS)
+    n = db.execute(text(f"""
+        INSERT INTO measurements_daily (city, source, day, {", ".join(_STAT_COLUMNS)})
+        {_DAILY_SELECT.format(**fmt)}
+        ON DUPLICATE KEY UPDATE {updates}
+    """), bind).rowcount
+    _store_sketches(db, _HOURLY_VALUES.format(**fmt), bind)
+    return n
+
+
+def _store_sketches(db: Session, select: str, params: dict):
+    # Rows arrive ordered by (city, source, ts), so each day's values are contiguous
+    update = text("""
+        UPDATE measurements_daily SET sketch_pm25 = :s25, sketch_pm10 = :s10
+        WHERE city = :c AND source = :s AND day = :d
+    """)
+    batch, key, pm25, pm10 = [], None, [], []
+
+    def flush_day():
+        if key is not None:
+            batch.append({"c": key[0], "s": key[1], "d": key[2],
+                          "s25": QuantileSketch.of(pm25).to_bytes() if pm25 else None,
+                          "s10": QuantileSketch.of(pm10).to_bytes() if pm10 else None})
+
+    for city, source, day, v25, v10 in db.execute(text(select), params):
+        if key is None or (city.lower(), source, day) != (key[0].lower(), key[1], key[2]):
+            flush_day()
+            key, pm25, pm10 = (city, source, day), [], []
+            if len(batch) >= _SKETCH_BATCH:
+                db.execute(update, batch)
+                batch = []
+        if v25 is not None:
+            pm25.append(float(v25))
+        if v10 is not None:
+            pm10.append(float(v10))
+    flush_day()
+    if batch:
+        db.execute(update, batch)
+
+
+def refresh_daily(db: Session, city: str, first: date, last: date, source: str = "aggregated") -> int:
+    """Recompute the daily rollups of one city/source for the days [first, last]; does not commit."""
+    lo = datetime.combine(first, datetime.min.time())
+    hi = datetime.combine(last + timedelta(days=1), datetime.min.time())
+    return rollup_hours(db, lo, hi, where="city = :c AND source = :s", params={"c": city, "s": source})
+
+
+def _moments(n: int, total: float, sumsq: float) -> tuple:
+    """(mean, population stddev) from count, sum and sum of squares."""
+    if not n:
+        return None, None
+    mean = total / n
+    return mean, math.sqrt(max(0.0, sumsq / n - mean * mean))
+
+
+def as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _midnight(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time())
+
+
+def full_days(lo: datetime, hi: datetime) -> Tuple[date, date]:
+    """First and last day lying entirely inside [lo, hi); first > last when there is none."""
+    first = lo.date() if lo == _midnight(lo.date()) else lo.date() + timedelta(days=1)
+    return first, hi.date() - timedelta(days=1)
+
+
+def hourly_spans(lo: datetime, hi: datetime, rolled: Set[date]) -> List[Tuple[datetime, datetime]]:
+    """
+    The parts of [lo, hi) to read from measurements: the partial days at either
+    end plus every full day without a rollup row, adjacent ones merged.
+    """
+    first, last = full_days(lo, hi)
+    spans: List[Tuple[datetime, datetime]] = []
+
+    def add(a: datetime, b: datetime):
+        if a >= b:
+            return
+        if spans and spans[-1][1] == a:
+            spans[-1] = (spans[-1][0], b)
+        else:
+            spans.append((a, b))
+
+    if first > last:
+        add(lo, hi)
+        return spans
+    add(lo, _midnight(first))
+    day = first
+    while day <= last:
+        if day not in rolled:
+            add(_midnight(day), _midnight(day + timedelta(days=1)))
+        day += timedelta(days=1)
+    add(_midnight(last + timedelta(days=1)), hi)
+    return spans
+
+
+def read_hours(db: Session, spans: Dict[str, List[Tuple[datetime, datetime]]], source: str = "aggregated",
+               columns: str = "city, ts, pm25, pm10") -> list:
+    """
+    Hourly rows for explicit per-city [lo, hi) spans; every clause is a
+    (city, source, ts) key-range scan, batched _SPANS_PER_QUERY to a statement.
+    """
+    clauses = [(city, a, b) for city, city_spans in spans.items() for a, b in city_spans]
+    rows: list = []
+    for at in range(0, len(clauses), _SPANS_PER_QUERY):
+        chunk = clauses[at:at + _SPANS_PER_QUERY]
+        params: Dict[str, Any] = {"s": source}
+        ors = []
+        for i, (city, a, b) in enumerate(chunk):
+            ors.append(f"(city = :c{i} AND ts >= :lo{i} AND ts < :hi{i})")
+            params.update({f"c{i}": city, f"lo{i}": a, f"hi{i}": b})
+        rows.extend(db.execute(text(
+            f"SELECT {columns} FROM measurements WHERE source = :s AND ({' OR '.join(ors)})"
+        ), params).fetchall())
+    return rows
+
+
+def window_stats(db: Session, cities: List[str], days: int, source: str = "aggregated") -> Dict[str, Dict[str, Any]]:
+    """
+    Per-city pm25/pm10 count, mean, min, max, stddev and p50/p95/p99 over the
+    last `days` days up to NOW() (the window compare_logic always used). Whole
+    days come from measurements_daily (moments summed, sketches merged) in one
+    query for all cities; the partial first day, today and any day without a
+    rollup row yet (history from before rollups existed) are then read hourly by
+    explicit ranges, so an unbackfilled table costs speed, not correctness.
+    Percentiles are None when some day in the window has no sketch yet (rollups
+    written before sketches existed; `python -m app.jobs.rollups` rebuilds them)
+    and are within the sketch's 1% relative error otherwise.
+    """
+    if not cities:
+        return {}
+    now = db.execute(text("SELECT NOW()")).scalar()
+    now = now if isinstance(now, datetime) else datetime.fromisoformat(str(now))
+    lo, hi = now - timedelta(days=days), now + timedelta(seconds=1)  # ts <= NOW()
+    first, last = full_days(lo, hi)
+    full = db.execute(text("""
+        SELECT city, day, n_hours,
+               n_pm25, sum_pm25, sumsq_pm25, min_pm25, max_pm25,
+               n_pm10, sum_pm10, sumsq_pm10, min_pm10, max_pm10,
+               sketch_pm25, sketch_pm10
+        FROM measurements_daily
+        WHERE city IN :cities AND source = :s AND day >= :first AND day <= :last
+    """).bindparams(bindparam("cities", expanding=True)),
+        {"cities": list(cities), "s": source, "first": first, "last": last}).fetchall() if first <= last else []
+
+    rolled: Dict[str, Set[date]] = {}
+    for row in full:
+        rolled.setdefault(row[0].lower(), set()).add(as_date(row[1]))
+    edges = read_hours(db, {c: hourly_spans(lo, hi, rolled.get(c.lower(), set())) for c in cities}, source,
+                       columns="city, pm25, pm10")
+
+    acc: Dict[str, dict] = {}
+
+    def entry(city: str) -> dict:
+        return acc.setdefault(city.lower(), {"n_points": 0, **{pol: {
+            "n": 0, "sum": 0.0, "sumsq": 0.0, "min": None, "max": None, "sketch": QuantileSketch(),
+        } for pol in ("pm25", "pm10")}})
+
+    def fold(a: dict, n: int, total, sumsq, lo, hi):
+        a["n"] += n
+        a["sum"] += float(total or 0)
+        a["sumsq"] += float(sumsq or 0)
+        if lo is not None:
+            a["min"] = float(lo) if a["min"] is None else min(a["min"], float(lo))
+        if hi is not None:
+            a["max"] = float(hi) if a["max"] is None else max(a["max"], float(hi))
+
+    for row in full:
+        e = entry(row[0])
+        e["n_points"] += int(row[2] or 0)
+        for i, pol, blob in ((3, "pm25", row[13]), (8, "pm10", row[14])):
+            fold(e[pol], int(row[i] or 0), *row[i + 1:i + 5])
+            if blob:
+                e[pol]["sketch"].merge(QuantileSketch.from_bytes(blob))
+    for city, v25, v10 in edges:
+        e = entry(city)
+        e["n_points"] += 1
+        for pol, v in (("pm25", v25), ("pm10", v10)):
+            if v is not None:
+                fold(e[pol], 1, v, float(v) * float(v), v, v)
+                e[pol]["sketch"].add(float(v))
+
+    out = {}
+    for city in cities:
+        e = acc.get(city.lower()) or entry(city)
+        stats = {"n_points": e["n_points"]}
+        for pol in ("pm25", "pm10"):
+            a = e[pol]
+            mean, std = _moments(a["n"], a["sum"], a["sumsq"])
+            # Percentiles only when every counted value is in the merged sketch
+            sketch = a["sketch"] if a["n"] and a["sketch"].count == a["n"] else None
+            stats.update({
+                f"mean_{pol}": mean,
+                f"min_{pol}": a["min"],
+                f"max_{pol}": a["max"],
+                f"std_{pol}": std,
+                **{f"{name}_{pol}": sketch.quantile(q) if sketch else None for name, q in PERCENTILES},
+            })
+        out[city] = stats
+    return out
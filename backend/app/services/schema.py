@@ -0,0 +1,137 @@
+import logging
+import os
+from typing import List, Sequence
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+
+logger = logging.getLogger(__name__)
+
+# (table, columns of the key every hot query and upsert relies on in index order, what breaks without it)
+EXPECTED_KEYS = (
+    ("measurements", ("city", "source", "ts"), "upserts use the staging merge"),
+    ("geocodes", ("city",), "REPLACE INTO piles up duplicate rows"),
+)
+
+# Added to measurements_daily after the table first shipped; create_all does not alter tables
+SKETCH_COLUMNS = ("sketch_pm25", "sketch_pm10")
+
+
+def _unique_keys(insp, table: str) -> List[Sequence[str]]:
+    keys = []
+    pk = insp.get_pk_constraint(table).get("constrained_columns") or []
+    if pk:
+        keys.append(list(pk))
+    keys.extend(list(ix["column_names"]) for ix in insp.get_indexes(table) if ix.get("unique"))
+    keys.extend(list(uc["column_names"]) for uc in insp.get_unique_constraints(table))
+    return keys
+
+
+def _has_prefix_index(insp, table: str, cols: Sequence[str]) -> bool:
+    return any(tuple(ix["column_names"][:len(cols)]) == tuple(cols) for ix in insp.get_indexes(table))
+
+
+def check_schema(engine: Engine) -> List[str]:
+    """
+    Problems with the keys the ingest/read paths depend on, as human-readable strings:
+      - no unique key over exactly the expected columns: for measurements ON DUPLICATE
+        KEY cannot fire, so upserts fall back to the slower staging-table merge
+      - a unique key in another column order and no index led by (city, source, ts):
+        the per-city ts range scans cannot use an index prefix and scan more rows
+    """
+    insp = inspect(engine)
+    tables = set(insp.get_table_names())
+    problems = []
+    for table, cols, impact in EXPECTED_KEYS:
+        if table not in tables:
+            problems.append(f"{table}: table missing")
+            continue
+        keys = _unique_keys(insp, table)
+        exact = [k for k in keys if set(k) == set(cols)]
+        if not exact:
+            problems.append(f"{table}: no unique key on ({', '.join(cols)}); {impact}")
+        elif not any(tuple(k) == cols for k in exact) and not _has_prefix_index(insp, table, cols):
+            problems.append(f"{table}: unique key {tuple(exact[0])} is not ordered {cols}; "
+                            f"ts range scans per city cannot use it")
+    if "measurements_daily" in tables:
+        have = {c["name"] for c in insp.get_columns("measurements_daily")}
+        missing = [c for c in SKETCH_COLUMNS if c not in have]
+        if missing:
+            problems.append(f"measurements_daily: missing {', '.join(missing)}; "
+                            f"compare cannot report percentiles from rollups")
+    if {"measurements", "measurements_daily"} <= tables:
+        with engine.connect() as conn:
+            has_hourly = conn.execute(text("SELECT 1 FROM measurements LIMIT 1")).first() is not None
+            has_daily = conn.execute(text("SELECT 1 FROM measurements_daily LIMIT 1")).first() is not None
+        if has_hourly and not has_daily:
+            problems.append("measurements_daily: empty while measurements has data; "
+                            "compare falls back to hourly rows for those days until `python -m app.jobs.rollups` backfills it")
+    return problems
+
+
+def _has_duplicates(engine: Engine) -> bool:
+    with engine.connect() as conn:
+        return conn.execute(text("""
+            SELECT 1 FROM measurements
+            GROUP BY city, source, ts
+            HAVING COUNT(*) > 1
+            LIMIT 1
+        """)).first() is not None
+
+
+def _fix_measurements(engine: Engine):
+    insp = inspect(engine)
+    cols = ("city", "source", "ts")
+    if not any(set(k) == set(cols) for k in _unique_keys(insp, "measurements")):
+        if _has_duplicates(engine):
+            logger.warning("measurements has duplicate (city, source, ts) rows; not adding the unique key. "
+                           "Deduplicate them first.")
+            return
+        ddl = "ALTER TABLE measurements ADD UNIQUE KEY uq_measurements_city_source_ts (city, source, ts)"
+    elif not _has_prefix_index(insp, "measurements", cols) and \
+            not any(tuple(k) == cols for k in _unique_keys(insp, "measurements")):
+        ddl = "ALTER TABLE measurements ADD INDEX ix_measurements_city_source_ts (city, source, ts)"
+    else:
+        return
+    with engine.begin() as conn:
+        conn.execute(text(ddl))
+    logger.info("Schema fix applied: %s", ddl)
+
+
+def _fix_rollup_sketches(engine: Engine):
+    have = {c["name"] for c in inspect(engine).get_columns("measurements_daily")}
+    adds = [f"ADD COLUMN {c} BLOB NULL" for c in SKETCH_COLUMNS if c not in have]
+    if not adds:
+        return
+    ddl = f"ALTER TABLE measurements_daily {', '.join(adds)}"
+    with engine.begin() as conn:
+        conn.execute(text(ddl))
+    logger.info("Schema fix applied: %s; run `python -m app.jobs.rollups` to fill them", ddl)
+
+
+def verify_schema(engine: Engine) -> List[str]:
+    """
+    Startup check: log every problem found by check_schema. With SCHEMA_AUTOFIX=1
+    the measurements key (or a correctly ordered index) and missing rollup sketch
+    columns are added first; the unique key is only added when there are no
+    duplicate rows.
+    Returns the problems still present.
+    """
+    problems = check_schema(engine)
+    if os.getenv("SCHEMA_AUTOFIX", "0") in ("1", "true", "True"):
+        fixes = []
+        if any(p.startswith("measurements: ") and "missing" not in p for p in problems):
+            fixes.append(_fix_measurements)
+        if any(p.startswith("measurements_daily: missing") for p in problems):
+            fixes.append(_fix_rollup_sketches)
+        for fix in fixes:
+            try:
+                fix(engine)
+            except Exception as e:
+                logger.warning("Schema fix failed: %s", e)
+        if fixes:
+            problems = check_schema(engine)
+    for p in problems:
+        logger.warning("Schema check: %s", p)
+    return problems
@@ -1,19 +1,35 @@
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from datetime import date, datetime, timedelta
+import logging
+import math
 import os
+import threading
+import time
+import numpy as np
 import requests
 from sqlalchemy import text
+
+from ..core.config import settings
+from .fetchers.frame import HourlyFrame, as_frame, iso_hours
+from .http_client import get_client
+from .raw_store import raw_store_enabled, write_frames
+from .rollups import refresh_daily
+from .singleflight import ingest_db_lock, ingest_flight
+from .upstream_cache import UpstreamCache, contiguous_ranges, get_cache, iter_days, location_key
 from sqlalchemy.orm import Session
 
-def fetch_open_meteo(lat: float, lon: float, start_date: str, end_date: str):
+logger = logging.getLogger(__name__)
+
+def _open_meteo_get(latitude: str, longitude: str, start_date: str, end_date: str):
     url = (
         "https://air-quality-api.open-meteo.com/v1/air-quality"
-        f"?latitude={lat}&longitude={lon}"
+        f"?latitude={latitude}&longitude={longitude}"
         "&hourly=pm2_5,pm10"
         f"&start_date={start_date}&end_date={end_date}"
         "&timezone=auto"
     )
     try:
-        r = requests.get(url, timeout=30)
+        r = get_client().get(url, timeout=30)
         r.raise_for_status()
         return r.json()
     except requests.Timeout:
@@ -22,129 +38,593 @@ def fetch_open_meteo(lat: float, lon: float, start_date: str, end_date: str):
         raise RuntimeError(f"OpenMeteoHTTP: {e}")
 
 
-def flatten_rows(city: str, lat: float, lon: float, data: dict):
+def _split_days(data: dict) -> dict[str, dict]:
+    """Split an Open-Meteo response into per-day {time, pm2_5, pm10} chunks (local dates)."""
+    hourly = data.get("hourly") or {}
+    times = hourly.get("time") or []
+    out: dict[str, dict] = {}
+    for i, t in enumerate(times):
+        chunk = out.setdefault(t[:10], {"time": [], "pm2_5": [], "pm10": []})
+        chunk["time"].append(t)
+        for key in ("pm2_5", "pm10"):
+            col = hourly.get(key)
+            chunk[key].append(None if col is None else col[i])
+    return out
+
+
+def _join_days(chunks: list[dict]) -> dict:
+    hourly = {"time": [], "pm2_5": [], "pm10": []}
+    for chunk in chunks:
+        for key in hourly:
+            hourly[key].extend(chunk.get(key) or [])
+    return {"hourly": hourly}
+
+
+def _cache_days(cache: UpstreamCache, lat: float, lon: float, lo: date, hi: date, data: dict) -> dict[date, dict]:
+    by_day = _split_days(data)
+    stored = {}
+    for day in iter_days(lo, hi):
+        chunk = by_day.get(day.isoformat())
+        # A day missing from the response is not cached for good; it may still arrive
+        ttl = cache.ttl_for_day(day) if chunk else cache.recent_ttl
+        chunk = chunk or {"time": [], "pm2_5": [], "pm10": []}
+        cache.put(location_key("open-meteo", lat, lon, day), chunk, ttl)
+        stored[day] = chunk
+    return stored
+
+
+def fetch_open_meteo(lat: float, lon: float, start_date: str, end_date: str):
+    """
+    Open-Meteo hourly PM for one location, served per day from the upstream cache
+    where possible; only uncached day ranges go to the network.
+    """
+    cache = get_cache()
+    if cache is None:
+        return _open_meteo_get(str(lat), str(lon), start_date, end_date)
+
+    days = list(iter_days(date.fromisoformat(start_date), date.fromisoformat(end_date)))
+    chunks = {day: cache.get(location_key("open-meteo", lat, lon, day)) for day in days}
+    missing = [day for day in days if chunks[day] is None]
+    for lo, hi in contiguous_ranges(missing):
+        data = _open_meteo_get(str(lat), str(lon), lo.isoformat(), hi.isoformat())
+        chunks.update(_cache_days(cache, lat, lon, lo, hi, data))
+    return _join_days([chunks[day] for day in days])
+
+
+def fetch_open_meteo_batch(coords: list[tuple[float, float]], start_date: str, end_date: str) -> list[dict]:
+    """
+    Fetch several locations in one request using Open-Meteo's comma-separated
+    latitude/longitude lists. Returns one response dict per input coordinate, in order.
+    """
+    if not coords:
+        return []
+    cache = get_cache()
+    lo, hi = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    days = list(iter_days(lo, hi))
+
+    # Locations whose every day is cached are served locally; the rest share one request
+    out: list[dict | None] = [None] * len(coords)
+    if cache is not None:
+        for i, (lat, lon) in enumerate(coords):
+            chunks = [cache.get(location_key("open-meteo", lat, lon, day)) for day in days]
+            if all(c is not None for c in chunks):
+                out[i] = _join_days(chunks)
+    todo = [i for i, d in enumerate(out) if d is None]
+    if not todo:
+        return out
+
+    lats = ",".join(str(coords[i][0]) for i in todo)
+    lons = ",".join(str(coords[i][1]) for i in todo)
+    data = _open_meteo_get(lats, lons, start_date, end_date)
+    # A single location comes back as an object, several as a list
+    if isinstance(data, dict):
+        data = [data]
+    if len(data) != len(todo):
+        raise RuntimeError(f"OpenMeteoBatch: expected {len(todo)} locations, got {len(data)}")
+    for i, loc in zip(todo, data):
+        if cache is not None:
+            _cache_days(cache, coords[i][0], coords[i][1], lo, hi, loc)
+        out[i] = loc
+    return out
+
+
+def flatten_rows(city: str, lat: float, lon: float, data: dict) -> HourlyFrame:
     times = data["hourly"]["time"]
     pm25  = data["hourly"].get("pm2_5")
     pm10  = data["hourly"].get("pm10")
-    rows = []
-    for i, ts in enumerate(times):
-        rows.append({
-            "ts": ts.replace("T", " ")+":00",  # MySQL DATETIME
-            "city": city,
-            "latitude": lat,
-            "longitude": lon,
-            "pm25": None if pm25 is None else pm25[i],
-            "pm10": None if pm10 is None else pm10[i],
-            "source": "open-meteo",
-        })
-    return rows
-
-def upsert_rows(db: Session, rows: list[dict]) -> int:
+    n = len(times)
+    return HourlyFrame(
+        iso_hours(times),
+        np.full(n, np.nan) if pm25 is None else np.array(pm25, dtype=float),
+        np.full(n, np.nan) if pm10 is None else np.array(pm10, dtype=float),
+        city, lat, lon, "open-meteo",
+    )
+
+_COLUMNS = ("ts", "city", "latitude", "longitude", "pm25", "pm10", "source")
+_VALUE_COLUMNS = ("latitude", "longitude", "pm25", "pm10")
+
+# Whether measurements has a unique key on (ts, city, source); probed once per process
+_unique_key: bool | None = None
+
+
+def _has_unique_key(db: Session) -> bool:
+    global _unique_key
+    if _unique_key is None:
+        cols_by_index: dict[str, set] = {}
+        for r in db.execute(text("SHOW INDEX FROM measurements")).mappings():
+            if int(r["Non_unique"]) == 0:
+                cols_by_index.setdefault(r["Key_name"], set()).add(r["Column_name"])
+        _unique_key = any(cols <= {"ts", "city", "source"} for cols in cols_by_index.values())
+    return _unique_key
+
+
+def _ts_key(ts) -> str:
+    return ts.strftime("%Y-%m-%d %H:%M:%S") if isinstance(ts, datetime) else str(ts)
+
+
+def _same_value(a, b) -> bool:
+    if a is None or b is None:
+        return a is None and b is None
+    return math.isclose(float(a), float(b), rel_tol=1e-6, abs_tol=1e-9)
+
+
+def _classify_rows(db: Session, rows: list[dict]):
+    """
+    Split rows into (new, changed, unchanged_count) against what is already stored,
+    with one range query per (city, source). Duplicate keys in `rows` keep the last one.
+    """
+    by_group: dict[tuple, dict[str, dict]] = {}
+    for r in rows:
+        by_group.setdefault((r["city"], r["source"]), {})[_ts_key(r["ts"])] = r
+
+    new_rows, changed_rows, unchanged = [], [], 0
+    for (city, source), group in by_group.items():
+        existing = {}
+        result = db.execute(text("""
+            SELECT ts, latitude, longitude, pm25, pm10
+            FROM measurements
+            WHERE city=:c AND source=:s AND ts BETWEEN :lo AND :hi
+        """), {"c": city, "s": source, "lo": min(group), "hi": max(group)}).mappings()
+        for e in result:
+            existing[_ts_key(e["ts"])] = e
+        for key, r in group.items():
+            old = existing.get(key)
+            if old is None:
+                new_rows.append(r)
+            elif all(_same_value(old[c], r.get(c)) for c in _VALUE_COLUMNS):
+                unchanged += 1
+            else:
+                changed_rows.append(r)
+    return new_rows, changed_rows, unchanged
+
+
+def _multi_row_insert(db: Session, head: str, rows: list[dict], tail: str = ""):
+    """Send rows as chunked multi-row VALUES statements: `head` VALUES (...),(...) `tail`."""
+    size = settings.UPSERT_CHUNK_SIZE
+    for i in range(0, len(rows), size):
+        chunk = rows[i:i + size]
+        params, groups = {}, []
+        for j, r in enumerate(chunk):
+            groups.append("(" + ", ".join(f":{c}_{j}" for c in _COLUMNS) + ")")
+            for c in _COLUMNS:
+                params[f"{c}_{j}"] = r.get(c)
+        db.execute(text(f"{head} VALUES {', '.join(groups)} {tail}"), params)
+
+
+def _stage_and_merge(db: Session, rows: list[dict]):
+    """Fallback when measurements has no unique key: load a temp table, merge set-based."""
+    db.execute(text("""
+        CREATE TEMPORARY TABLE IF NOT EXISTS measurements_stage (
+            ts DATETIME NOT NULL,
+            city VARCHAR(190) NOT NULL,
+            latitude DOUBLE NULL,
+            longitude DOUBLE NULL,
+            pm25 DOUBLE NULL,
+            pm10 DOUBLE NULL,
+            source VARCHAR(32) NOT NULL,
+            PRIMARY KEY (city, source, ts)
+        )
+    """))
+    db.execute(text("DELETE FROM measurements_stage"))
+    _multi_row_insert(db, "INSERT INTO measurements_stage (ts, city, latitude, longitude, pm25, pm10, source)", rows)
+    db.execute(text("""
+        UPDATE measurements m
+          JOIN measurements_stage s ON m.city=s.city AND m.source=s.source AND m.ts=s.ts
+           SET m.latitude=s.latitude, m.longitude=s.longitude, m.pm25=s.pm25, m.pm10=s.pm10
+    """))
+    db.execute(text("""
+        INSERT INTO measurements (ts, city, latitude, longitude, pm25, pm10, source)
+        SELECT s.ts, s.city, s.latitude, s.longitude, s.pm25, s.pm10, s.source
+          FROM measurements_stage s
+          LEFT JOIN measurements m ON m.city=s.city AND m.source=s.source AND m.ts=s.ts
+         WHERE m.ts IS NULL
+    """))
+    db.execute(text("DROP TEMPORARY TABLE IF EXISTS measurements_stage"))
+
+
+def upsert_rows_with_stats(db: Session, rows: list[dict] | HourlyFrame) -> dict:
+    """
+    Bulk upsert into measurements. Rows identical to what is stored are skipped;
+    the rest go out as chunked multi-row INSERT ... ON DUPLICATE KEY UPDATE, or
+    through a staging-table merge when the unique key is missing.
+    Returns {"inserted", "updated", "unchanged"} row counts (all zero on failure).
+    """
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0}
     if not rows:
-        return 0
-    # Try native upsert; if the DB lacks the unique key, fallback to code-level upsert
+        return stats
+    if isinstance(rows, HourlyFrame):
+        # Parameter binding needs one mapping per row; expand only at the DB boundary
+        rows = rows.to_rows()
     try:
-        sql = text("""
-                   INSERT INTO measurements (ts, city, latitude, longitude, pm25, pm10, source)
-                   VALUES (:ts, :city, :latitude, :longitude, :pm25, :pm10, :source)
-                       ON DUPLICATE KEY UPDATE
-                                            pm25=VALUES(pm25),
-                                            pm10=VALUES(pm10),
-                                            latitude=VALUES(latitude),
-                                            longitude=VALUES(longitude);
-                   """)
-        db.execute(sql, rows)
+        new_rows, changed_rows, unchanged = _classify_rows(db, rows)
+        to_write = new_rows + changed_rows
+        if to_write:
+            if _has_unique_key(db):
+                _multi_row_insert(
+                    db,
+                    "INSERT INTO measurements (ts, city, latitude, longitude, pm25, pm10, source)",
+                    to_write,
+                    """ON DUPLICATE KEY UPDATE
+                           pm25=VALUES(pm25),
+                           pm10=VALUES(pm10),
+                           latitude=VALUES(latitude),
+                           longitude=VALUES(longitude)""",
+                )
+            else:
+                _stage_and_merge(db, to_write)
         db.commit()
-        return len(rows)
-    except Exception:
-        pass
+        stats.update(inserted=len(new_rows), updated=len(changed_rows), unchanged=unchanged)
+    except Exception as e:
+        logger.warning("upsert_rows failed: %s", e)
+        db.rollback()
+    return stats
+
+
+def upsert_rows(db: Session, rows: list[dict] | HourlyFrame) -> int:
+    stats = upsert_rows_with_stats(db, rows)
+    return stats["inserted"] + stats["updated"] + stats["unchanged"]
+
+
+def _source_timeouts() -> tuple[float, float]:
+    """Per-source deadline and overall budget (seconds) for one city's fetch fan-out."""
+    per_source = settings.SOURCE_TIMEOUT
+    return per_source, max(per_source, settings.SCRAPE_BUDGET)
 
-    # Fallback: INSERT IGNORE, then UPDATE existing by (ts, city, source)
+
+def _fetch_sources_concurrently(fetchers: dict, per_source: float, budget: float):
+    """
+    Run each fetcher in its own worker thread and wait at most `per_source`
+    seconds for each one, never longer than `budget` in total.
+    Fetchers are keyed by (source, range_index); Open-Meteo may use the whole budget.
+    Returns (rows_by_key, errors_by_key, timed_out_keys).
+    Fetchers still running after their deadline are abandoned, not waited for.
+    """
+    results: dict = {}
+    errors: dict = {}
+    timed_out: list = []
+    if not fetchers:
+        return results, errors, timed_out
+
+    started = time.monotonic()
+    budget_deadline = started + budget
+    pool = ThreadPoolExecutor(max_workers=len(fetchers), thread_name_prefix="scrape")
     try:
-        ins_sql = text("""
-            INSERT IGNORE INTO measurements (ts, city, latitude, longitude, pm25, pm10, source)
-            VALUES (:ts, :city, :latitude, :longitude, :pm25, :pm10, :source)
-        """)
-        db.execute(ins_sql, rows)
-        upd_sql = text("""
-            UPDATE measurements
-               SET latitude=:latitude, longitude=:longitude, pm25=:pm25, pm10=:pm10
-             WHERE ts=:ts AND city=:city AND source=:source
-        """)
-        for r in rows:
-            db.execute(upd_sql, r)
-        db.commit()
-        return len(rows)
-    except Exception:
+        futures = {key: pool.submit(fn) for key, fn in fetchers.items()}
+        for key, fut in futures.items():
+            deadline = min(started + (budget if key[0] == 'open-meteo' else per_source), budget_deadline)
+            try:
+                results[key] = fut.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FuturesTimeout:
+                fut.cancel()
+                timed_out.append(key)
+                results[key] = []
+            except Exception as e:
+                errors[key] = e
+                results[key] = []
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results, errors, timed_out
+
+
+def sum_counts(counts: dict) -> int:
+    # Non-integer entries (e.g. the 'timed_out' list) are metadata, not row counts
+    return sum(v for v in counts.values() if isinstance(v, int) and not isinstance(v, bool))
+
+
+# Last fetch time (UTC) of each recent (city, day), process-local. Recent days are
+# still provisional upstream: Open-Meteo returns forecast values for the hours of
+# the current day that have not happened yet.
+_day_fetched: dict[tuple[str, date], datetime] = {}
+_today_lock = threading.Lock()
+_FETCH_MEMORY_DAYS = 7
+
+
+def _provisional_since(now: datetime) -> date:
+    # Same margin as the upstream cache: days are local to the location, so a day
+    # counts as closed only once UTC is a full day past it
+    return now.date() - timedelta(days=1)
+
+
+def _mark_days_fetched(city: str, ranges: list[tuple[date, date]]):
+    now = datetime.utcnow()
+    horizon = now.date() - timedelta(days=_FETCH_MEMORY_DAYS)
+    with _today_lock:
+        for lo, hi in ranges:
+            day = max(lo, horizon)
+            while day <= hi:
+                _day_fetched[(city, day)] = now
+                day += timedelta(days=1)
+        for key in [k for k in _day_fetched if k[1] < horizon]:
+            del _day_fetched[key]
+
+
+def _missing_ranges(db: Session, city: str, start: date, end: date) -> list[tuple[date, date]]:
+    """
+    Coverage check for (city, source='aggregated') over [start, end].
+    A day counts as covered when it is missing at most INGEST_GAP_TOLERANCE_HOURS
+    hours and its stored values are final:
+      - provisional days (yesterday, today) only if fetched within INGEST_TODAY_TTL seconds
+      - a closed day last fetched while still provisional is fetched once more
+    Fetch times are kept in process for the last week; after a restart recent days
+    are simply refetched once.
+    Returns the uncovered days collapsed into contiguous (first, last) date ranges.
+    """
+    try:
+        rows = db.execute(text("""
+            SELECT DATE(ts) AS d, COUNT(*) AS n
+            FROM measurements
+            WHERE city=:c AND source='aggregated'
+              AND ts >= :start AND ts < :end
+            GROUP BY DATE(ts)
+        """), {"c": city, "start": start.isoformat(), "end": (end + timedelta(days=1)).isoformat()}).fetchall()
+    except Exception as e:
+        logger.warning("Coverage check failed for %s, fetching full window: %s", city, e)
         db.rollback()
-        return 0
+        return [(start, end)]
 
-def _collect_and_upsert(db: Session, city: str, days: int, sources: list[str] | None):
-    from .geocode import get_coords_for_city
-    from .fetchers.openaq import fetch_openaq
-    from .fetchers.iqair import fetch_iqair
-    from .fetchers.waqi import fetch_waqi
-    from .fetchers.normalize import make_row, parse_ts
-    from .aggregate import combine_by_timestamp
-    lat, lon = get_coords_for_city(db, city)
+    need = 24 - settings.INGEST_GAP_TOLERANCE_HOURS
+    hours_by_day = {}
+    for d, n in rows:
+        d = d if isinstance(d, date) else datetime.strptime(str(d), "%Y-%m-%d").date()
+        hours_by_day[d] = int(n)
 
-    # use datetime today instead of just date
-    end = datetime.utcnow().date()   # or datetime.now().date()
-    start = end - timedelta(days=days)
+    now = datetime.utcnow()
+    provisional = _provisional_since(now)
+    ttl = timedelta(seconds=settings.INGEST_TODAY_TTL)
+    with _today_lock:
+        fetched = {d: t for (c, d), t in _day_fetched.items() if c == city}
+
+    def final(day: date) -> bool:
+        last = fetched.get(day)
+        if day >= provisional:
+            return last is not None and now - last < ttl
+        # Closed: fine unless our last fetch happened before the day closed
+        return last is None or last >= datetime.combine(day + timedelta(days=2), datetime.min.time())
+
+    ranges: list[tuple[date, date]] = []
+    day = start
+    while day <= end:
+        covered = hours_by_day.get(day, 0) >= need and final(day)
+        if not covered:
+            if ranges and ranges[-1][1] == day - timedelta(days=1):
+                ranges[-1] = (ranges[-1][0], day)
+            else:
+                ranges.append((day, day))
+        day += timedelta(days=1)
+    return ranges
 
-    data = fetch_open_meteo(lat, lon, start.isoformat(), end.isoformat())
-    rows_open_meteo = flatten_rows(city, lat, lon, data)
 
+def _enabled_sources(sources: list[str] | None) -> set[str]:
     # Toggle additional sources via SOURCES_ENABLED (comma-separated)
     enabled_env = os.getenv('SOURCES_ENABLED', '').lower()
     enabled_set = set([s.strip() for s in enabled_env.split(',') if s.strip()])
     if sources:
         enabled_set = set([s.strip().lower() for s in sources if s and isinstance(s, str)])
+    return enabled_set
 
-    src_rows = {
-        'open-meteo': rows_open_meteo
-    }
 
-    # Fetch from OpenAQ
-    if not enabled_set or 'openaq' in enabled_set:
-        try:
-            src_rows['openaq'] = fetch_openaq(city, start, end, lat, lon)
-        except Exception:
-            src_rows['openaq'] = []
+def _window(days: int) -> tuple[date, date]:
+    # use datetime today instead of just date
+    end = datetime.utcnow().date()   # or datetime.now().date()
+    start = end - timedelta(days=days)
+    return start, end
 
-    # Fetch from IQAir (HTML)
-    if not enabled_set or 'iqair' in enabled_set:
-        try:
-            src_rows['iqair'] = fetch_iqair(city, start, end, lat, lon)
-        except Exception:
-            src_rows['iqair'] = []
 
-    # Fetch from WAQI (API if token present, else HTML)
-    if not enabled_set or 'waqi' in enabled_set:
-        try:
-            token = os.getenv('WAQI_TOKEN')
-            src_rows['waqi'] = fetch_waqi(city, start, end, lat, lon, token)
-        except Exception:
-            src_rows['waqi'] = []
+def _ingest_ranges(db: Session, city: str, lat: float, lon: float, end: date,
+                   ranges: list[tuple[date, date]], sources: list[str] | None,
+                   open_meteo_data: dict | None = None):
+    """
+    Fetch every enabled source for the given day ranges, aggregate and upsert.
+    `open_meteo_data` maps a range to an already-fetched Open-Meteo response
+    (from a batched request); those ranges skip their own Open-Meteo call.
+    """
+    from .canonical import fetch_name
+    from .fetchers.openaq import fetch_openaq
+    from .fetchers.iqair import fetch_iqair
+    from .fetchers.waqi import fetch_waqi
+    from .aggregate import combine_by_timestamp
+
+    enabled_set = _enabled_sources(sources)
+    open_meteo_data = open_meteo_data or {}
+
+    counts: dict = {'open-meteo': 0}
+    if not ranges:
+        counts['aggregated'] = 0
+        counts['timed_out'] = []
+        counts['fetched_ranges'] = []
+        return counts
+
+    # Open-Meteo is the primary source and always runs; the others are optional.
+    # All of them are fetched concurrently so wall time is the slowest source, not the sum.
+    token = os.getenv('WAQI_TOKEN')
+    # Upstream name lookups get the bare place name; rows are stored under `city`
+    query = fetch_name(city)
+    fetchers = {}
+    for i, (lo, hi) in enumerate(ranges):
+        if (lo, hi) in open_meteo_data:
+            fetchers[('open-meteo', i)] = lambda data=open_meteo_data[(lo, hi)]: flatten_rows(city, lat, lon, data)
+        else:
+            fetchers[('open-meteo', i)] = lambda lo=lo, hi=hi: flatten_rows(city, lat, lon, fetch_open_meteo(lat, lon, lo.isoformat(), hi.isoformat()))
+        if not enabled_set or 'openaq' in enabled_set:
+            fetchers[('openaq', i)] = lambda lo=lo, hi=hi: fetch_openaq(query, lo, hi, lat, lon)
+        # IQAir (HTML) and WAQI (API if token present, else HTML) only report current
+        # conditions, so they are only useful for the range that reaches today
+        if hi == end and (not enabled_set or 'iqair' in enabled_set):
+            fetchers[('iqair', i)] = lambda lo=lo, hi=hi: fetch_iqair(query, lo, hi, lat, lon)
+        if hi == end and (not enabled_set or 'waqi' in enabled_set):
+            fetchers[('waqi', i)] = lambda lo=lo, hi=hi: fetch_waqi(query, lo, hi, lat, lon, token)
+
+    per_source, budget = _source_timeouts()
+    results, errors, timed_out_keys = _fetch_sources_concurrently(fetchers, per_source, budget)
+
+    # Open-Meteo failures still surface to the caller as before
+    for key, err in errors.items():
+        if key[0] == 'open-meteo':
+            raise err
+    if any(key[0] == 'open-meteo' for key in timed_out_keys):
+        raise RuntimeError("OpenMeteoTimeout: upstream timed out")
+    for key, err in errors.items():
+        logger.warning("Source %s failed for %s: %s", key[0], city, err)
+    timed_out = sorted({key[0] for key in timed_out_keys})
+    if timed_out:
+        logger.warning("Sources timed out for %s: %s", city, ", ".join(timed_out))
+
+    src_frames: dict[str, list[HourlyFrame]] = {}
+    for (name, _), frame in results.items():
+        frame = as_frame(frame)
+        if frame is not None:
+            frame.city = city
+            src_frames.setdefault(name, []).append(frame)
+    src_rows = {name: HourlyFrame.concat(frames) for name, frames in src_frames.items()}
 
     # Aggregate combined signal
-    agg_rows = combine_by_timestamp(city, lat, lon, src_rows.get('openaq', []), src_rows.get('iqair', []), src_rows.get('waqi', []), src_rows.get('open-meteo', []))
+    agg_rows = combine_by_timestamp(city, lat, lon, src_rows.get('openaq'), src_rows.get('iqair'), src_rows.get('waqi'), src_rows.get('open-meteo'))
 
     # Only save aggregated data, not individual source data
-    counts: dict[str, int] = {}
     # Count individual sources for reporting but don't save them
-    for k, v in src_rows.items():
-        counts[k] = len(v) if v else 0
-    
+    for (name, _) in results:
+        counts[name] = len(src_rows[name]) if src_rows.get(name) is not None else 0
+    counts['timed_out'] = timed_out
+    counts['fetched_ranges'] = [[lo.isoformat(), hi.isoformat()] for lo, hi in ranges]
+
     # Only save the aggregated data to database
-    counts['aggregated'] = upsert_rows(db, agg_rows) if agg_rows else 0
+    stats = upsert_rows_with_stats(db, agg_rows)
+    counts['aggregated'] = stats['inserted'] + stats['updated'] + stats['unchanged']
+    counts['upsert'] = stats
+
+    # Keep the daily rollups of the touched days in step with the hourly rows
+    if stats['inserted'] or stats['updated']:
+        try:
+            first, last = (date(1970, 1, 1) + timedelta(days=int(h) // 24) for h in (agg_rows.hours.min(), agg_rows.hours.max()))
+            refresh_daily(db, city, first, last)
+            db.commit()
+        except Exception as e:
+            logger.warning("Rollup refresh failed for %s: %s", city, e)
+            db.rollback()
+
+    # Keep the per-source inputs too, so aggregation settings can change without a re-scrape
+    if raw_store_enabled():
+        try:
+            counts['raw_store'] = {'written': write_frames(db, src_rows.values())}
+        except Exception as e:
+            logger.warning("Raw store write failed for %s: %s", city, e)
+            db.rollback()
+    if counts['aggregated']:
+        _mark_days_fetched(city, ranges)
+
+    return counts
+
+
+def _ingest_coalesced(db: Session, city: str, days: int, sources: list[str] | None,
+                      lat: float, lon: float, ranges: list[tuple[date, date]] | None = None,
+                      open_meteo_data: dict | None = None) -> dict:
+    """
+    Run _ingest_ranges for one city behind a single flight keyed by
+    (city, window, sources): concurrent callers for the same key wait for the
+    first one and share its counts instead of fetching and upserting again.
+    With INGEST_DB_LOCK=1 the leader also takes a MySQL named lock so other
+    workers coalesce too; if it had to wait for that lock, the missing ranges
+    are recomputed since the other worker has usually filled them by then.
+    """
+    start, end = _window(days)
+    key = (city, days, tuple(sorted(_enabled_sources(sources))))
+
+    def run():
+        with ingest_db_lock(db, key) as waited:
+            # Only hit upstreams for the parts of the window we don't already hold
+            todo = ranges if ranges is not None and not waited else _missing_ranges(db, city, start, end)
+            return _ingest_ranges(db, city, lat, lon, end, todo, sources, open_meteo_data)
 
+    return ingest_flight().do(key, run)
+
+
+def _collect_and_upsert(db: Session, city: str, days: int, sources: list[str] | None):
+    from .canonical import resolve_city
+    from .geocode import get_coords_for_city
+    # Every spelling of a city ingests into (and coalesces on) its canonical name
+    city = resolve_city(db, city).name
+    lat, lon = get_coords_for_city(db, city)
+    counts = _ingest_coalesced(db, city, days, sources, lat, lon)
     return counts, (lat, lon)
 
 
+def _prefetch_open_meteo(plans: dict) -> dict:
+    """
+    Issue one Open-Meteo request per batch of cities that need the same day range.
+    `plans` maps city -> (lat, lon, ranges). Returns city -> {range: response}.
+    A failed batch is skipped; its cities fall back to their own per-city request.
+    """
+    by_range: dict[tuple[date, date], list[str]] = {}
+    for city, (_, _, ranges) in plans.items():
+        for rng in ranges:
+            by_range.setdefault(rng, []).append(city)
+
+    size = settings.OPEN_METEO_BATCH_SIZE
+    prefetched: dict[str, dict] = {city: {} for city in plans}
+    for (lo, hi), cities in by_range.items():
+        if len(cities) < 2:
+            continue
+        for i in range(0, len(cities), size):
+            chunk = cities[i:i + size]
+            coords = [(plans[c][0], plans[c][1]) for c in chunk]
+            try:
+                responses = fetch_open_meteo_batch(coords, lo.isoformat(), hi.isoformat())
+            except Exception as e:
+                logger.warning("Batched Open-Meteo fetch failed for %d cities: %s", len(chunk), e)
+                continue
+            for c, data in zip(chunk, responses):
+                prefetched[c][(lo, hi)] = data
+    return prefetched
+
+
+def ensure_windows_for_cities(db: Session, cities: list[str], days: int, sources: list[str] | None = None):
+    """
+    Multi-city variant of ensure_window_for_city_with_counts for /compare.
+    Geocodes every city first, then fetches Open-Meteo for all of them in batched
+    requests before running the per-city fetch/aggregate/upsert.
+    Returns {city: (counts, (lat, lon))} keyed by the caller's spellings.
+    """
+    from .canonical import resolve_cities
+    from .geocode import get_coords_for_cities
+    start, end = _window(days)
+
+    refs = resolve_cities(db, cities)
+    plans: dict = {}
+    for city, (lat, lon) in get_coords_for_cities(db, [ref.name for ref in refs.values()]).items():
+        plans[city] = (lat, lon, _missing_ranges(db, city, start, end))
+
+    prefetched = _prefetch_open_meteo(plans)
+
+    done = {}
+    for city, (lat, lon, ranges) in plans.items():
+        counts = _ingest_coalesced(db, city, days, sources, lat, lon, ranges, prefetched.get(city))
+        done[city] = (counts, (lat, lon))
+    return {city: done[ref.name] for city, ref in refs.items()}
+
+
 def ensure_window_for_city(db: Session, city: str, days: int, sources: list[str] | None = None):
     counts, coords = _collect_and_upsert(db, city, days, sources)
-    total = sum(counts.values())
+    total = sum_counts(counts)
     return total, coords
 
 
@@ -0,0 +1,154 @@
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+from .rollups import as_date, full_days, hourly_spans, read_hours
+
+
+logger = logging.getLogger(__name__)
+
+RESOLUTIONS = ("hour", "day", "week")
+
+# Hourly buckets come from measurements. Daily and weekly ones take whole days
+# from the rollups, which also cover history past the hourly retention window,
+# and the partial edge days plus any day without a rollup from hourly rows.
+# Weeks start on Monday.
+_HOURLY = """
+    SELECT city, ts AS t, COUNT(*) AS n, AVG(pm25) AS pm25, AVG(pm10) AS pm10
+    FROM measurements
+    WHERE city IN :cities AND source = :s AND ts >= :lo AND ts < :hi
+    GROUP BY city, ts
+    ORDER BY city, t
+"""
+
+_ROLLED_DAYS = """
+    SELECT city, day, n_hours, n_pm25, sum_pm25, n_pm10, sum_pm10
+    FROM measurements_daily
+    WHERE city IN :cities AND source = :s AND day >= :first AND day <= :last
+"""
+
+
+def _ts(t) -> str:
+    if isinstance(t, datetime):
+        return t.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(t, date):
+        return t.strftime("%Y-%m-%d 00:00:00")
+    return str(t)
+
+
+def _epoch(ts: str) -> float:
+    return datetime.strptime(ts, "%Y-%m-%d %H:%M:%S").timestamp()
+
+
+def lttb(points: Sequence[Dict[str, Any]], threshold: int, key: str = "pm25") -> List[Dict[str, Any]]:
+    """
+    Largest-Triangle-Three-Buckets: keep `threshold` points (first and last
+    included) that preserve the visual shape of `key` over time. Points where
+    `key` is None are dropped first; shorter series are returned as is.
+    """
+    pts = [p for p in points if p.get(key) is not None]
+    if threshold >= len(pts) or threshold < 3:
+        return list(pts)
+    xs = [_epoch(p["ts"]) for p in pts]
+    ys = [float(p[key]) for p in pts]
+
+    out = [pts[0]]
+    every = (len(pts) - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle vertex
+        nxt_lo = int((i + 1) * every) + 1
+        nxt_hi = min(int((i + 2) * every) + 1, len(pts))
+        span = nxt_hi - nxt_lo
+        avg_x = sum(xs[nxt_lo:nxt_hi]) / span
+        avg_y = sum(ys[nxt_lo:nxt_hi]) / span
+
+        lo, hi = int(i * every) + 1, int((i + 1) * every) + 1
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+        out.append(pts[best])
+        a = best
+    out.append(pts[-1])
+    return out
+
+
+def _bucket(day: date, resolution: str) -> date:
+    return day - timedelta(days=day.weekday()) if resolution == "week" else day
+
+
+def _rolled_up(db: Session, cities: List[str], lo: datetime, hi: datetime, resolution: str,
+               source: str) -> List[Dict[str, Any]]:
+    # Per (city, bucket): [hours, n_pm25, sum_pm25, n_pm10, sum_pm10]
+    first, last = full_days(lo, hi)
+    rows = db.execute(
+        text(_ROLLED_DAYS).bindparams(bindparam("cities", expanding=True)),
+        {"cities": list(cities), "s": source, "first": first, "last": last},
+    ).fetchall() if first <= last else []
+    sums: Dict[tuple, list] = {}
+    rolled: Dict[str, set] = {}
+    for city, day, n, n25, s25, n10, s10 in rows:
+        day = as_date(day)
+        rolled.setdefault(city.lower(), set()).add(day)
+        acc = sums.setdefault((city.lower(), _bucket(day, resolution)), [0, 0, 0.0, 0, 0.0])
+        acc[0] += int(n or 0)
+        acc[1] += int(n25 or 0)
+        acc[2] += float(s25 or 0)
+        acc[3] += int(n10 or 0)
+        acc[4] += float(s10 or 0)
+    spans = {c: hourly_spans(lo, hi, rolled.get(c.lower(), set())) for c in cities}
+    for city, ts, v25, v10 in read_hours(db, spans, source):
+        acc = sums.setdefault((city.lower(), _bucket(as_date(ts), resolution)), [0, 0, 0.0, 0, 0.0])
+        acc[0] += 1
+        if v25 is not None:
+            acc[1] += 1
+            acc[2] += float(v25)
+        if v10 is not None:
+            acc[3] += 1
+            acc[4] += float(v10)
+    return [
+        {"city": city, "t": bucket, "n": a[0],
+         "pm25": a[2] / a[1] if a[1] else None, "pm10": a[4] / a[3] if a[3] else None}
+        for (city, bucket), a in sorted(sums.items())
+    ]
+
+
+def load_series(db: Session, cities: List[str], lo: datetime, hi: datetime, resolution: str = "hour",
+                max_points: Optional[int] = None, source: str = "aggregated") -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Mean pm25/pm10 per city and `resolution` bucket over the hours in [lo, hi),
+    for all cities at once; every resolution covers exactly the same hours, so
+    daily and weekly points are the means of the hourly ones they span. `n` is
+    the number of hourly rows behind each point. With `max_points`, each city's
+    series is reduced with LTTB on pm25. Results are keyed by the names as passed in.
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"resolution must be one of {', '.join(RESOLUTIONS)}")
+    if not cities:
+        return {}
+    if resolution == "hour":
+        rows = db.execute(
+            text(_HOURLY).bindparams(bindparam("cities", expanding=True)),
+            {"cities": list(cities), "s": source, "lo": lo, "hi": hi},
+        ).mappings().all()
+    else:
+        rows = _rolled_up(db, cities, lo, hi, resolution, source)
+
+    by_city: Dict[str, List[Dict[str, Any]]] = {}
+    for r in rows:
+        by_city.setdefault(r["city"].lower(), []).append({
+            "ts": _ts(r["t"]),
+            "pm25": float(r["pm25"]) if r["pm25"] is not None else None,
+            "pm10": float(r["pm10"]) if r["pm10"] is not None else None,
+            "n": int(r["n"] or 0),
+        })
+    out = {}
+    for c in cities:
+        series = by_city.get(c.lower(), [])
+        out[c] = lttb(series, max_points) if max_points and len(series) > max_points else series
+    return out
@@ -0,0 +1,122 @@
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller runs the
+    function, later callers block until it finishes and get the same result
+    (or the same exception). Nothing is cached once the call has returned.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"in_flight": len(self._calls), "coalesced": self.coalesced}
+
+
+_ingest_flight = SingleFlight()
+
+
+def ingest_flight() -> SingleFlight:
+    return _ingest_flight
+
+
+def _lock_name(key: Hashable) -> str:
+    # MySQL caps lock names at 64 characters
+    return "airq:" + hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+
+
+@contextmanager
+def ingest_db_lock(db: Session, key: Hashable) -> Iterator[bool]:
+    """
+    Cross-worker variant of the in-process single flight, enabled with INGEST_DB_LOCK=1.
+
+    Holds a MySQL named lock (GET_LOCK) for `key` on a dedicated connection, since
+    the session's own connection is handed back to the pool on every commit.
+    Yields True when another worker held the lock first, so the caller should
+    re-check what is still missing before fetching. If the lock cannot be taken
+    within INGEST_DB_LOCK_TIMEOUT seconds the caller proceeds unlocked.
+    """
+    if not settings.INGEST_DB_LOCK:
+        yield False
+        return
+
+    name = _lock_name(key)
+    try:
+        conn = db.get_bind().connect()
+    except Exception as e:
+        logger.warning("Ingest lock unavailable, continuing without it: %s", e)
+        yield False
+        return
+
+    acquired = False
+    waited = False
+    try:
+        try:
+            acquired = conn.execute(text("SELECT GET_LOCK(:n, 0)"), {"n": name}).scalar() == 1
+            if not acquired:
+                waited = True
+                acquired = conn.execute(text("SELECT GET_LOCK(:n, :t)"),
+                                        {"n": name, "t": settings.INGEST_DB_LOCK_TIMEOUT}).scalar() == 1
+                if not acquired:
+                    logger.warning("Timed out waiting for ingest lock %s, continuing without it", name)
+        except Exception as e:
+            logger.warning("Ingest lock failed, continuing without it: %s", e)
+        yield waited
+    finally:
+        try:
+            if acquired:
+                conn.execute(text("SELECT RELEASE_LOCK(:n)"), {"n": name})
+        finally:
+            conn.close()
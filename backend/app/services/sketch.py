@@ -0,0 +1,124 @@
+"""
+Mergeable quantile sketch for pollutant values (DDSketch-style log buckets).
+
+Values are counted in buckets whose bounds grow geometrically by
+gamma = (1 + ALPHA) / (1 - ALPHA), so any quantile read back is within ALPHA
+(1%) relative error of the exact nearest-rank value, and merging two sketches
+is adding their bucket counts. Values at or below ZERO_CUTOFF share one zero
+bucket. ALPHA is part of the stored format: sketches written with a different
+value cannot be merged, hence the version byte.
+
+Serialized form: version byte, zero-bucket count, then (bucket index delta,
+count) pairs, all as varints; a day of hourly readings takes a few dozen bytes.
+"""
+import math
+from typing import Dict, Iterable, Optional
+
+
+ALPHA = 0.01
+ZERO_CUTOFF = 1e-6
+_VERSION = 1
+_GAMMA = (1 + ALPHA) / (1 - ALPHA)
+_LOG_GAMMA = math.log(_GAMMA)
+
+
+def _put_varint(out: bytearray, n: int):
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(b | 0x80)
+        else:
+            out.append(b)
+            return
+
+
+def _get_varint(data: bytes, pos: int):
+    n = shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return n, pos
+        shift += 7
+
+
+def _zigzag(n: int) -> int:
+    return n * 2 if n >= 0 else -n * 2 - 1
+
+
+def _unzigzag(n: int) -> int:
+    return n >> 1 if not n & 1 else -((n + 1) >> 1)
+
+
+class QuantileSketch:
+    __slots__ = ("buckets", "zeros", "count")
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+
+    @classmethod
+    def of(cls, values: Iterable[Optional[float]]) -> "QuantileSketch":
+        sk = cls()
+        for v in values:
+            if v is not None:
+                sk.add(v)
+        return sk
+
+    def add(self, value: float, n: int = 1):
+        if value <= ZERO_CUTOFF:
+            self.zeros += n
+        else:
+            i = math.ceil(math.log(value) / _LOG_GAMMA)
+            self.buckets[i] = self.buckets.get(i, 0) + n
+        self.count += n
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        for i, n in other.buckets.items():
+            self.buckets[i] = self.buckets.get(i, 0) + n
+        self.zeros += other.zeros
+        self.count += other.count
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Nearest-rank q-quantile (rank ceil(q * count)), or None when empty."""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(q * self.count))
+        seen = self.zeros
+        if seen >= rank:
+            return 0.0
+        for i in sorted(self.buckets):
+            seen += self.buckets[i]
+            if seen >= rank:
+                return 2 * _GAMMA ** i / (_GAMMA + 1)
+        return 2 * _GAMMA ** max(self.buckets) / (_GAMMA + 1)
+
+    def to_bytes(self) -> bytes:
+        out = bytearray([_VERSION])
+        _put_varint(out, self.zeros)
+        prev = 0
+        for i in sorted(self.buckets):
+            _put_varint(out, _zigzag(i - prev))
+            _put_varint(out, self.buckets[i])
+            prev = i
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "QuantileSketch":
+        if not data or data[0] != _VERSION:
+            raise ValueError("unsupported sketch format")
+        sk = cls()
+        sk.zeros, pos = _get_varint(data, 1)
+        sk.count = sk.zeros
+        i = 0
+        while pos < len(data):
+            delta, pos = _get_varint(data, pos)
+            n, pos = _get_varint(data, pos)
+            i += _unzigzag(delta)
+            sk.buckets[i] = n
+            sk.count += n
+        return sk
@@ -0,0 +1,159 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "cache")
+
+
+class UpstreamCache:
+    """
+    Size-bounded on-disk cache for upstream responses, one entry per location and day.
+
+    Closed past days never change upstream, so they are stored without expiry;
+    the still-open recent days get a short TTL. Entries live in a single SQLite
+    file; once the file holds more than `max_bytes` of payload, the least recently
+    used entries are evicted down to 90% of the limit.
+    """
+
+    def __init__(self, path: str, max_bytes: int, recent_ttl: float):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.recent_ttl = recent_ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def ttl_for_day(self, day: date) -> Optional[float]:
+        """None (no expiry) for closed days, the short TTL for yesterday/today/future.
+        Upstream days are local to the location, so 'closed' keeps a one-day margin on UTC."""
+        return None if day < datetime.utcnow().date() - timedelta(days=1) else self.recent_ttl
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM entries WHERE key=?", (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] < now):
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE entries SET accessed_at=? WHERE key=?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any, ttl: Optional[float]):
+        blob = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM entries WHERE key=?", (key,)).fetchone()
+            self._conn.execute(
+                "REPLACE INTO entries (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), None if ttl is None else now + ttl, now),
+            )
+            self._bytes += len(blob) - (old[0] if old else 0)
+            if self._bytes > self.max_bytes:
+                self._evict(int(self.max_bytes * 0.9))
+
+    def _evict(self, target: int):
+        # Expired entries go first, then least recently used
+        now = time.time()
+        cur = self._conn.execute(
+            "SELECT key, size FROM entries ORDER BY (expires_at IS NOT NULL AND expires_at < ?) DESC, accessed_at",
+            (now,),
+        )
+        victims: List[Tuple[str]] = []
+        for key, size in cur:
+            if self._bytes <= target:
+                break
+            victims.append((key,))
+            self._bytes -= size
+        self._conn.executemany("DELETE FROM entries WHERE key=?", victims)
+        self.evictions += len(victims)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "entries": entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else None,
+                "evictions": self.evictions,
+            }
+
+
+_cache: Optional[UpstreamCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[UpstreamCache]:
+    """
+    Shared cache instance, or None when disabled with UPSTREAM_CACHE=0.
+    Config: UPSTREAM_CACHE_PATH, UPSTREAM_CACHE_MAX_MB (default 256),
+    UPSTREAM_CACHE_RECENT_TTL seconds for still-open days (default 900).
+    """
+    global _cache
+    if not settings.UPSTREAM_CACHE:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = UpstreamCache(
+                        settings.UPSTREAM_CACHE_PATH or os.path.join(CACHE_DIR, "upstream.sqlite3"),
+                        int(settings.UPSTREAM_CACHE_MAX_MB * 1024 * 1024),
+                        settings.UPSTREAM_CACHE_RECENT_TTL,
+                    )
+                except Exception as e:
+                    logger.warning("Upstream cache unavailable: %s", e)
+                    return None
+    return _cache
+
+
+def location_key(source: str, lat: float, lon: float, day: date, extra: str = "") -> str:
+    # ~1km rounding; upstream grids are coarser than that
+    return f"{source}:{round(float(lat), 2):.2f}:{round(float(lon), 2):.2f}:{extra}:{day.isoformat()}"
+
+
+def iter_days(start: date, end: date) -> Iterable[date]:
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+def contiguous_ranges(days: List[date]) -> List[Tuple[date, date]]:
+    """Collapse sorted days into (first, last) runs of consecutive days."""
+    ranges: List[Tuple[date, date]] = []
+    for day in days:
+        if ranges and ranges[-1][1] == day - timedelta(days=1):
+            ranges[-1] = (ranges[-1][0], day)
+        else:
+            ranges.append((day, day))
+    return ranges
@@ -1,30 +1,98 @@
+import os
+
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import bindparam, text
 
-def compare_logic(db: Session, cities: list[str], days: int):
-    by_city = {}
-    want_end   = "NOW()"
-    want_start = f"DATE_SUB({want_end}, INTERVAL {days} DAY)"
+from ..services.canonical import resolve_cities
+from ..services.rollups import PERCENTILES, window_stats
+
+def _hourly_stats(db: Session, city: str, days: int) -> dict:
+    rows = db.execute(text("""
+        SELECT ts, pm25, pm10
+        FROM measurements
+        WHERE city=:c AND source='aggregated'
+          AND ts >= DATE_SUB(NOW(), INTERVAL :days DAY) AND ts <= NOW()
+        ORDER BY ts
+    """), {"c": city, "days": days}).mappings().all()
+
+    vals = [r["pm25"] for r in rows if r["pm25"] is not None]
+    mean_pm25 = (sum(vals)/len(vals)) if vals else None
+    min_pm25  = min(vals) if vals else None
+    max_pm25  = max(vals) if vals else None
+
+    return {
+        "n_points": len(rows),
+        "mean_pm25": mean_pm25,
+        "min_pm25": min_pm25,
+        "max_pm25": max_pm25,
+    }
+
+def _percentile_cols(col: str, rank: str, n: str) -> str:
+    # Nearest-rank percentile: the value at rank ceil(p * n) among the non-null values
+    return ",\n           ".join(
+        f"MAX(CASE WHEN {rank} = GREATEST(1, CEIL({p} * {n})) THEN {col} END) AS {name}_{col}"
+        for name, p in PERCENTILES
+    )
+
+_SQL_STATS = f"""
+    WITH w AS (
+        SELECT city, pm25, pm10,
+               ROW_NUMBER() OVER (PARTITION BY city ORDER BY pm25 IS NULL, pm25) AS r25,
+               COUNT(pm25) OVER (PARTITION BY city) AS n25,
+               ROW_NUMBER() OVER (PARTITION BY city ORDER BY pm10 IS NULL, pm10) AS r10,
+               COUNT(pm10) OVER (PARTITION BY city) AS n10
+        FROM measurements
+        WHERE city IN :cities AND source='aggregated'
+          AND ts >= DATE_SUB(NOW(), INTERVAL :days DAY) AND ts <= NOW()
+    )
+    SELECT city, COUNT(*) AS n_points,
+           AVG(pm25) AS mean_pm25, MIN(pm25) AS min_pm25, MAX(pm25) AS max_pm25, STDDEV_POP(pm25) AS std_pm25,
+           {_percentile_cols("pm25", "r25", "n25")},
+           AVG(pm10) AS mean_pm10, MIN(pm10) AS min_pm10, MAX(pm10) AS max_pm10, STDDEV_POP(pm10) AS std_pm10,
+           {_percentile_cols("pm10", "r10", "n10")}
+    FROM w
+    GROUP BY city
+"""
+
+_SQL_KEYS = ["n_points"] + [
+    f"{stat}_{pol}" for pol in ("pm25", "pm10")
+    for stat in ("mean", "min", "max", "std") + tuple(name for name, _ in PERCENTILES)
+]
+
+def _sql_stats(db: Session, cities: list[str], days: int) -> dict:
+    """
+    Stats for all cities in one grouped statement (window functions, MySQL 8+):
+    n_points, mean/min/max/stddev and nearest-rank p50/p95/p99 for pm25 and pm10.
+    """
+    if not cities:
+        return {}
+    rows = db.execute(
+        text(_SQL_STATS).bindparams(bindparam("cities", expanding=True)),
+        {"cities": list(cities), "days": days},
+    ).mappings().all()
+    found = {r["city"].lower(): r for r in rows}
+    out = {}
     for c in cities:
-        rows = db.execute(text(f"""
-            SELECT ts, pm25, pm10
-            FROM measurements
-            WHERE city=:c AND source='aggregated'
-              AND ts >= {want_start} AND ts <= {want_end}
-            ORDER BY ts
-        """), {"c": c}).mappings().all()
-
-        vals = [r["pm25"] for r in rows if r["pm25"] is not None]
-        mean_pm25 = (sum(vals)/len(vals)) if vals else None
-        min_pm25  = min(vals) if vals else None
-        max_pm25  = max(vals) if vals else None
-
-        by_city[c] = {
-            "n_points": len(rows),
-            "mean_pm25": mean_pm25,
-            "min_pm25": min_pm25,
-            "max_pm25": max_pm25,
-        }
+        r = found.get(c.lower())
+        out[c] = {k: (None if r is None or r[k] is None else float(r[k])) for k in _SQL_KEYS}
+        out[c]["n_points"] = int(r["n_points"]) if r is not None else 0
+    return out
+
+def compare_logic(db: Session, cities: list[str], days: int):
+    # COMPARE_ENGINE=rollup (default) answers from measurements_daily plus the two
+    # partial edge days, percentiles from merged daily sketches; "sql" runs one
+    # grouped query over the hourly rows with exact percentiles; "hourly" reads
+    # every hourly row city by city as before
+    engine = os.getenv("COMPARE_ENGINE", "rollup")
+    refs = resolve_cities(db, cities, create=False)
+    names = list(dict.fromkeys(refs[c].name for c in cities))
+    if engine == "hourly":
+        stats = {n: _hourly_stats(db, n, days) for n in names}
+    elif engine == "sql":
+        stats = _sql_stats(db, names, days)
+    else:
+        stats = window_stats(db, names, days)
+    by_city = {c: dict(stats[refs[c].name]) for c in cities}
 
     has_vals = {c:v for c,v in by_city.items() if v["mean_pm25"] is not None}
     best  = min(has_vals, key=lambda k: has_vals[k]["mean_pm25"]) if has_vals else None
@@ -21,16 +21,20 @@ def build_report(title, cities, content, chart_images=None, llm_conclusion=None)
     story.append(Spacer(1, 12))
 
     if isinstance(content, dict) and "byCity" in content:
-        data = [["City", "Mean PM2.5 (µg/m³)", "Min", "Max", "Points"]]
+        with_pct = any(v.get("p95_pm25") is not None for v in content["byCity"].values())
+        data = [["City", "Mean PM2.5 (µg/m³)", "Min", "Max", "Points"] + (["P95", "P99"] if with_pct else [])]
         for c, vals in content["byCity"].items():
             mean_val = vals.get("mean_pm25", vals.get("mean_yhat"))
-            data.append([
+            row = [
                 c,
                 f"{mean_val:.2f}" if mean_val is not None else "-",
                 vals.get("min_pm25", "-"),
                 vals.get("max_pm25", "-"),
                 vals.get("n_points", "-"),
-            ])
+            ]
+            if with_pct:
+                row += [f"{vals[k]:.2f}" if vals.get(k) is not None else "-" for k in ("p95_pm25", "p99_pm25")]
+            data.append(row)
         t = Table(data)
         t.setStyle(TableStyle([
             ("BACKGROUND", (0,0), (-1,0), colors.HexColor("#4B5563")),
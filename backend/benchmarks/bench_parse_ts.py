@@ -0,0 +1,49 @@
+"""
+Micro-benchmark for fetchers.normalize timestamp parsing.
+
+Run from backend/:  python benchmarks/bench_parse_ts.py [n]
+Compares plain dateutil with parse_ts (scalar fast paths) and parse_ts_hours
+(vectorized) on the timestamp shapes the fetchers actually see.
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dateutil import parser as dtparser  # noqa: E402
+
+from app.services.fetchers.normalize import parse_ts, parse_ts_hours  # noqa: E402
+
+
+def _samples(n: int) -> dict:
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    stamps = [base + timedelta(minutes=37 * i) for i in range(n)]
+    return {
+        "iso Z (OpenAQ utc)": [t.strftime("%Y-%m-%dT%H:%M:%SZ") for t in stamps],
+        "iso offset (OpenAQ local)": [t.astimezone(timezone(timedelta(hours=5, minutes=30))).isoformat() for t in stamps],
+        "mysql datetime": [t.strftime("%Y-%m-%d %H:%M:%S") for t in stamps],
+        "epoch seconds": [str(int(t.timestamp())) for t in stamps],
+    }
+
+
+def _time(fn, values) -> float:
+    start = time.perf_counter()
+    fn(values)
+    return time.perf_counter() - start
+
+
+def main(n: int = 20000):
+    print(f"{'format':<28}{'dateutil':>12}{'parse_ts':>12}{'vectorized':>12}{'speedup':>10}")
+    for name, values in _samples(n).items():
+        t_dateutil = _time(lambda vs: [dtparser.parse(v) for v in vs], values) if "epoch" not in name else float("nan")
+        t_scalar = _time(lambda vs: [parse_ts(v) for v in vs], values)
+        t_vector = _time(parse_ts_hours, values)
+        ref = t_dateutil if t_dateutil == t_dateutil else t_scalar
+        print(f"{name:<28}{t_dateutil * 1e3:>10.1f}ms{t_scalar * 1e3:>10.1f}ms{t_vector * 1e3:>10.1f}ms"
+              f"{ref / min(t_scalar, t_vector):>9.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
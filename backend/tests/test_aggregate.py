@@ -0,0 +1,99 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from app.services.aggregate import combine_by_timestamp
+from app.services.fetchers.frame import HourlyFrame
+
+
+def _reference(frames, weights, method, threshold):
+    """The per-hour scalar loop combine_by_timestamp replaced, kept as the oracle."""
+    by_hour = {}
+    for f in frames:
+        w = weights.get(f.source, 1.0)
+        for h, a, b in zip(f.hours.tolist(), f.pm25.tolist(), f.pm10.tolist()):
+            bucket = by_hour.setdefault(h, ([], []))
+            if not math.isnan(a):
+                bucket[0].append((a, w))
+            if not math.isnan(b):
+                bucket[1].append((b, w))
+
+    def trim(values):
+        if not values or method is None:
+            return values
+        xs = [x for x, _ in values]
+        if method == "iqr":
+            s = sorted(xs)
+            if len(s) < 4:
+                return values
+            q1, q3 = s[len(s) // 4], s[3 * len(s) // 4]
+            lo, hi = q1 - threshold * (q3 - q1), q3 + threshold * (q3 - q1)
+            return [(x, w) for x, w in values if lo <= x <= hi]
+        mean = sum(xs) / len(xs)
+        std = (sum((x - mean) ** 2 for x in xs) / max(1, len(xs) - 1)) ** 0.5
+        return values if std == 0 else [(x, w) for x, w in values if abs((x - mean) / std) <= threshold]
+
+    def mean(values):
+        den = sum(w for _, w in values)
+        return sum(x * w for x, w in values) / den if values and den else None
+
+    out = {}
+    for h, (v25, v10) in by_hour.items():
+        m25, m10 = mean(trim(v25)), mean(trim(v10))
+        if m25 is not None or m10 is not None:
+            out[h] = (m25, m10)
+    return out
+
+
+def _frames():
+    """Four sources over two days: missing hours, NaN cells, repeated hours and spikes."""
+    rnd = random.Random(11)
+    frames = []
+    for source in ("openmeteo", "openaq", "waqi", "iqair"):
+        hours, pm25, pm10 = [], [], []
+        for h in range(480000, 480048):
+            if rnd.random() < 0.2:
+                continue
+            for _ in range(2 if rnd.random() < 0.2 else 1):
+                base = 30 + 10 * math.sin(h / 5)
+                a = base * rnd.uniform(0.8, 1.2) if rnd.random() > 0.15 else math.nan
+                b = a * 1.6 if rnd.random() > 0.3 else math.nan
+                if rnd.random() < 0.05:
+                    a = 900.0
+                hours.append(h)
+                pm25.append(a)
+                pm10.append(b)
+        order = list(range(len(hours)))
+        rnd.shuffle(order)
+        frames.append(HourlyFrame([hours[i] for i in order], [pm25[i] for i in order],
+                                  [pm10[i] for i in order], "Delhi", 28.6, 77.2, source))
+    return frames
+
+
+@pytest.mark.parametrize("method,threshold", [(None, 0.0), ("zscore", 1.0), ("zscore", 3.0), ("iqr", 1.5)])
+@pytest.mark.parametrize("weights", [{}, {"openaq": 0.5, "waqi": 2.0}])
+def test_matches_scalar_reference(monkeypatch, method, threshold, weights):
+    monkeypatch.setenv("AGG_TRIM", "1" if method else "0")
+    monkeypatch.setenv("AGG_TRIM_METHOD", method or "zscore")
+    monkeypatch.setenv("AGG_Z", str(threshold))
+    monkeypatch.setenv("AGG_IQR_K", str(threshold))
+    monkeypatch.setenv("AGG_WEIGHTS", ",".join(f"{k}={v}" for k, v in weights.items()))
+    frames = _frames()
+
+    got = combine_by_timestamp("Delhi", 28.6, 77.2, *frames, None)
+    expected = _reference(frames, weights, method, threshold)
+
+    assert got.source == "aggregated"
+    assert got.hours.tolist() == sorted(expected)
+    for h, a, b in zip(got.hours.tolist(), got.pm25.tolist(), got.pm10.tolist()):
+        e25, e10 = expected[h]
+        assert (np.isnan(a), np.isnan(b)) == (e25 is None, e10 is None)
+        assert a == pytest.approx(e25 if e25 is not None else math.nan, rel=1e-12, nan_ok=True)
+        assert b == pytest.approx(e10 if e10 is not None else math.nan, rel=1e-12, nan_ok=True)
+
+
+def test_no_sources_gives_an_empty_frame():
+    out = combine_by_timestamp("Delhi", 28.6, 77.2, None)
+    assert len(out) == 0 and out.source == "aggregated"
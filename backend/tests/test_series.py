@@ -0,0 +1,87 @@
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.models import Base
+from app.services.series import load_series, lttb
+
+
+HI = datetime(2026, 3, 10, 15)          # next whole hour, as the /series router computes it
+LO = HI - timedelta(days=12)
+
+
+@pytest.fixture
+def db():
+    """SQLite measurements with gaps and forecast hours past HI; about half the closed days rolled up."""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Base.metadata.tables["measurements"],
+                                             Base.metadata.tables["measurements_daily"]])
+    session = Session(engine)
+    rnd = random.Random(7)
+    by_day = defaultdict(list)
+    ts = LO - timedelta(days=3)
+    while ts < HI + timedelta(hours=9):
+        if rnd.random() > 0.1:
+            pm25 = rnd.lognormvariate(3, 0.6)
+            pm10 = None if rnd.random() < 0.2 else pm25 * 1.5
+            session.execute(text("INSERT INTO measurements (city, source, ts, pm25, pm10) "
+                                 "VALUES ('Delhi', 'aggregated', :ts, :a, :b)"), {"ts": ts, "a": pm25, "b": pm10})
+            by_day[ts.date()].append((pm25, pm10))
+        ts += timedelta(hours=1)
+    for day, rows in by_day.items():
+        if day < HI.date() and rnd.random() < 0.5:
+            a = [r[0] for r in rows]
+            b = [r[1] for r in rows if r[1] is not None]
+            session.execute(text("""
+                INSERT INTO measurements_daily (city, source, day, n_hours, n_pm25, sum_pm25, n_pm10, sum_pm10)
+                VALUES ('Delhi', 'aggregated', :d, :n, :n25, :s25, :n10, :s10)
+            """), {"d": day, "n": len(rows), "n25": len(a), "s25": sum(a), "n10": len(b), "s10": sum(b) if b else None})
+    # Today's rollup already includes the forecast hours; /series must not use it
+    session.execute(text("INSERT INTO measurements_daily (city, source, day, n_hours, n_pm25, sum_pm25, n_pm10) "
+                         "VALUES ('Delhi', 'aggregated', :d, 24, 24, 99999, 0)"), {"d": HI.date()})
+    session.commit()
+    yield session
+    session.close()
+
+
+def _rebucket(hourly, week: bool):
+    acc = defaultdict(lambda: [0, 0, 0.0])
+    for p in hourly:
+        day = datetime.strptime(p["ts"][:10], "%Y-%m-%d").date()
+        key = day - timedelta(days=day.weekday()) if week else day
+        acc[key][0] += p["n"]
+        if p["pm25"] is not None:
+            acc[key][1] += 1
+            acc[key][2] += p["pm25"]
+    return {k.strftime("%Y-%m-%d 00:00:00"): (n, s / c if c else None) for k, (n, c, s) in sorted(acc.items())}
+
+
+@pytest.mark.parametrize("resolution", ["day", "week"])
+def test_daily_and_weekly_agree_with_hourly(db, resolution):
+    hourly = load_series(db, ["Delhi"], LO, HI, "hour")["Delhi"]
+    coarse = load_series(db, ["Delhi"], LO, HI, resolution)["Delhi"]
+    expected = _rebucket(hourly, resolution == "week")
+
+    assert [p["ts"] for p in coarse] == list(expected)
+    for p in coarse:
+        n, mean = expected[p["ts"]]
+        assert p["n"] == n
+        assert p["pm25"] == pytest.approx(mean)
+    assert sum(p["n"] for p in coarse) == len(hourly)
+
+
+def test_lttb_keeps_endpoints_and_size():
+    start = datetime(2026, 1, 1)
+    pts = [{"ts": (start + timedelta(hours=i)).strftime("%Y-%m-%d %H:%M:%S"), "pm25": float(i % 17)}
+           for i in range(1000)]
+    pts[500]["pm25"] = 500.0
+    out = lttb(pts, 50)
+    assert len(out) == 50
+    assert out[0] is pts[0] and out[-1] is pts[-1]
+    assert [p["ts"] for p in out] == sorted(p["ts"] for p in out)
+    assert pts[500] in out
+    assert lttb(pts[:10], 50) == pts[:10]
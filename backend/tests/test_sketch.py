@@ -0,0 +1,45 @@
+import math
+import random
+
+import pytest
+
+from app.services.sketch import ALPHA, QuantileSketch
+
+
+def _nearest_rank(values, q):
+    s = sorted(values)
+    return s[max(1, math.ceil(q * len(s))) - 1]
+
+
+@pytest.fixture
+def values():
+    rnd = random.Random(3)
+    # Skewed like real PM readings, with zeros and a few spikes
+    return ([rnd.lognormvariate(3, 0.8) for _ in range(5000)] + [0.0] * 40
+            + [rnd.uniform(400, 900) for _ in range(25)])
+
+
+@pytest.mark.parametrize("q", [0.01, 0.25, 0.5, 0.9, 0.95, 0.99, 1.0])
+def test_quantile_within_relative_error(values, q):
+    exact = _nearest_rank(values, q)
+    got = QuantileSketch.of(values).quantile(q)
+    assert abs(got - exact) <= ALPHA * exact + 1e-12
+
+
+def test_merge_equals_sketch_of_union(values):
+    parts = [values[i::7] for i in range(7)]
+    merged = QuantileSketch()
+    for part in parts:
+        merged.merge(QuantileSketch.of(part))
+    whole = QuantileSketch.of(values)
+    assert (merged.buckets, merged.zeros, merged.count) == (whole.buckets, whole.zeros, whole.count)
+
+
+def test_bytes_round_trip(values):
+    sk = QuantileSketch.of(values + [None])
+    back = QuantileSketch.from_bytes(sk.to_bytes())
+    assert (back.buckets, back.zeros, back.count) == (sk.buckets, sk.zeros, sk.count)
+    assert back.quantile(0.95) == sk.quantile(0.95)
+    assert QuantileSketch().quantile(0.5) is None
+    with pytest.raises(ValueError):
+        QuantileSketch.from_bytes(b"\x7f")